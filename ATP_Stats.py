@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+
+from atp import cube, data, labels, query, ranks, series, warmup
 
 #setting wide layout so graphs look better
 st.set_page_config(
@@ -9,6 +10,9 @@ st.set_page_config(
     layout="wide"
 )
 
+#loads the other datasets and plotly in the background the first time any page runs
+warmup.start()
+
 
 
 #webpage title
@@ -27,68 +31,19 @@ metric_choice = st.sidebar.selectbox(
 )
 
 
-#reads dataframe depending on users choice
-@st.cache_data(ttl=3600) #refresh every hour
-def load_data(metric_choice):
-    if metric_choice == 'Serve Rating':
-        return pd.read_csv('data_files/atp_serve_data.csv')
-    elif metric_choice == 'Return Rating':
-        return pd.read_csv('data_files/atp_return_data.csv')
-    else:
-        return pd.read_csv('data_files/atp_pressure_data.csv')
-df = load_data(metric_choice)
-
-
-#titles each graph
-title_map = {
-    'Serve Rating' : 'ATP Serve Rating Over Time',
-    'Return Rating' : 'ATP Return Rating Over Time',
-    'Under Pressure Rating' : 'ATP under Pressure Rating Over Time'
-}
-
-#selects y-axis
-metric_col_map = {
-    'Serve Rating' : 'ServeRating',
-    'Return Rating' : 'ReturnRating',
-    'Under Pressure Rating' : 'PressureRating'
-
-}
-
-# creating a subset of stats for each dataframe
-stat_map = {
-    'Serve Rating' : ['FirstServePct', 'FirstServePointsWonPct', 'SecondServePointsWonPct', 'ServiceGamesWonPct', 'AvgAcesPerMatch', 'AvgDblFaultsPerMatch'],
-    'Return Rating' : ['FirstServeReturnPointsWonPct', 'SecondServeReturnPointsWonPct',	'ReturnGamesWonPct', 'BrkPointsConvertedPct'],
-    'Under Pressure Rating' : ['BrkPointsConvertedPct', 'BrkPointsSavedPct', 'TieBreaksWonPct', 'DecidingSetsWonPct']
-}
-
-stat_label_map = {
-    'FirstServePct' : 'First Serve %',
-    'FirstServePointsWonPct' : 'First Serve Points Won %',
-    'SecondServePointsWonPct' : 'Second Serve Points Won %',
-    'ServiceGamesWonPct' : 'Service Games Won %',
-    'AvgAcesPerMatch' : 'Average Aces Per Match',
-    'AvgDblFaultsPerMatch' : 'Average Double Faults Per Match',
-    'FirstServeReturnPointsWonPct' : 'First Serve Return Points Won %',
-    'SecondServeReturnPointsWonPct' : 'Second Serve Return Points Won %',
-    'ReturnGamesWonPct' : 'Return Games Won %', 
-    'BrkPointsConvertedPct' : 'Break Points Converted %', 
-    'BrkPointsSavedPct' : 'Break Points Saved %', 
-    'TieBreaksWonPct' : 'Tie Breaks Won %', 
-    'DecidingSetsWonPct' : 'Deciding Sets Won %'
-
-}
+#reads dataframe depending on users choice. Cached in atp.data until the csv changes
+df = query.add_year(data.read_ratings(metric_choice))
 
 
+#titles, axis labels and stat subsets live in atp.labels so the CLI uses the same names
+title_map = labels.title_map
+metric_col_map = data.metric_col_map
+stat_map = labels.stat_map
+stat_label_map = labels.stat_label_map
 
 
 
 
-#converting time to a numeric value and making sure it is a year. Not including Career and 52 Week
-df['year'] = df['time'].str.extract(r'(\d{4})').astype(float) #extracting four digit year
-serve_data = df.dropna(subset=['year'])
-
-
-
 #unique lists of options for filters
 players = sorted(df['PlayerName'].unique())
 surface = sorted(df['surface'].unique())
@@ -96,7 +51,7 @@ vs_rank = sorted(df['vs_rank'].unique())
 
 
 #players filter
-selected_players = st.sidebar.multiselect('Select Player(s)', players, default=['Roger Federer', 'Novak Djokovic', 'Rafael Nadal'])
+selected_players = st.sidebar.multiselect('Select Player(s)', players, default=labels.big_three)
 
 
 #checks if the keys exist within session state. Sets default to 'all'
@@ -108,17 +63,7 @@ if 'selected_vs_rank' not in st.session_state:
 
 #creating filter logic. More than one filter can be present, unless it is 'all' which clears the filter
 def update_filter(key):
-    sel = st.session_state[key] #grabs current list of selected fitlers
-
-    # If 'all' selected, there's more than one filter, and 'all' is most recent, overide to 'all'
-    if 'all' in sel and len(sel) > 1 and sel[-1] == 'all':
-        st.session_state[key] = ['all']
-    # If another option clicked while 'all' is present → remove 'all'
-    elif 'all' in sel and len(sel) > 1:
-        st.session_state[key] = [opt for opt in sel if opt != 'all'] # key = 
-    # If nothing selected → default to 'all'
-    elif not sel:
-        st.session_state[key] = ['all']
+    st.session_state[key] = query.resolve_selection(st.session_state[key], 'all')
 
 
 
@@ -141,44 +86,16 @@ selected_vs_rank = st.sidebar.multiselect(  #vs_rank filter
 )
 
 
-#new filtered df
-filtered_df = df.copy()
-
-
-
-#surface filter
-if 'all' in selected_surface:
-    filtered_df = filtered_df[filtered_df['surface'] == 'all']  #if 'all', only show 'all'
-else:
-    filtered_df = filtered_df[filtered_df['surface'].isin(selected_surface)] #otherwise show the selections
-
-
-#vs_rank filter
-if 'all' in selected_vs_rank:
-    filtered_df = filtered_df[filtered_df['vs_rank'] == 'all']  #if 'all', only show 'all'
-else:
-    filtered_df = filtered_df[filtered_df['vs_rank'].isin(selected_vs_rank)] #otherwise show the selections
-
-#players filter logic (line chart only)
-if selected_players:
-    filtered_df = filtered_df[filtered_df['PlayerName'].isin(selected_players)]
-
+#new filtered df. Surface and vs rank follow the 'all' rule, and more than one selection is averaged
+filtered_df = query.rating_lines(df, metric_choice, selected_players, selected_surface, selected_vs_rank)
 
-scatter_df = df.copy()
-
-
-
-#if more than one filter is selected, takes the average of the values
-if (len(selected_surface) > 1 and 'all' not in selected_surface) or (len(selected_vs_rank) > 1 and 'all' not in selected_vs_rank):
-    filtered_df = filtered_df.groupby(['PlayerName', 'year'])[metric_col_map[metric_choice]].mean().reset_index()
+#rank and percentile within the slice, from tables built once per data version. Averaged rows have no slice, so no ranks
+filtered_df = ranks.with_rating_ranks(filtered_df, metric_choice)
+rating_rank_col, rating_pct_col = ranks.rank_columns(metric_col_map[metric_choice])
+has_ranks = rating_rank_col in filtered_df.columns
 
 #y-axis labels for graphing
-metric_axis_labels = {
-    'Serve Rating' : 'Serve Rating',
-    'Return Rating' : 'Return Rating',
-    'Under Pressure Rating' : 'Pressure Rating'
-
-}
+metric_axis_labels = labels.metric_axis_labels
 
 
 
@@ -187,29 +104,47 @@ if 'active_tab_index' not in st.session_state:
     st.session_state.active_tab_index = 0
 
 
-#two tabs for different graphs
-tab_1, tab_2 = st.tabs(["Ratings Over Time", "Stat Correlations"])
+#plotly is only imported once there is a chart to draw, so the filters show up first
+import plotly.express as px
+
+#four tabs for different graphs
+tab_1, tab_2, tab_3, tab_4 = st.tabs(["Ratings Over Time", "Stat Correlations", "Percentile Profile", "Surface Vs Rank"])
 
 
 #first tab
 with tab_1:
-    if not filtered_df.empty:
+    #yearly rows sorted by player and year, built once per data version. The year range is a searchsorted slice per player
+    rating_series = series.rating_series(metric_choice)
+    first_year, last_year = rating_series.year_bounds()
+    year_range = (first_year, last_year)
+    if first_year is not None and first_year < last_year:  #no slider without at least two seasons to pick from
+        year_range = st.slider('Select Years', first_year, last_year, year_range)
+
+    #no players picked plots everyone, same as the Stat Correlations tab
+    line_df = query.rating_lines(rating_series.range(selected_players or None, *year_range), metric_choice, None, selected_surface, selected_vs_rank)
+    line_df = ranks.with_rating_ranks(line_df, metric_choice, [metric_col_map[metric_choice]])
+
+    if not line_df.empty:
         fig = px.line(  #line chart
-            filtered_df,
+            line_df,
             x='year',
             y=metric_col_map[metric_choice], #user selcection
             color='PlayerName',
             title=title_map[metric_choice],  #user selection
+            hover_data={rating_rank_col: True, rating_pct_col: ':.1f', 'Ranked': True} if rating_rank_col in line_df.columns else None,
             labels={'year' : 'Year', 
                     metric_col_map[metric_choice] : metric_axis_labels[metric_choice],
-                    'PlayerName' : 'Player'
+                    'PlayerName' : 'Player',
+                    rating_rank_col : 'Rank',
+                    rating_pct_col : 'Percentile',
+                    'Ranked' : 'Players Ranked'
                     }
         )
+        fig.update_xaxes(tickformat='d')  #numeric year axis, without the thousands separator
+        st.plotly_chart(fig, use_container_width=True)
     else:
         st.info('No data found for the selected options.')
 
-    st.plotly_chart(fig, use_container_width=True)
-
 
 
 
@@ -238,6 +173,7 @@ with tab_2:
     #cleaner x and y labels
     x_label = stat_label_map[selected_stat]
     y_label = metric_axis_labels[metric_choice]
+    stat_rank_col, stat_pct_col = ranks.rank_columns(selected_stat)
 
 
     fig_scatter = px.scatter( #scatter plot
@@ -248,10 +184,87 @@ with tab_2:
         trendline='ols',
         trendline_scope="overall",
         title=f"{y_label} Vs {x_label}",  #user choices
+        hover_data={stat_rank_col: True, stat_pct_col: ':.1f'} if has_ranks else None,
         labels={
             selected_stat: x_label,
             metric_col_map[metric_choice]: y_label,
-            'PlayerName': 'Player'
+            'PlayerName': 'Player',
+            stat_rank_col: f'{x_label} Rank',
+            stat_pct_col: f'{x_label} Percentile'
         }
 )
-    st.plotly_chart(fig_scatter, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(fig_scatter, use_container_width=True)
+
+
+
+
+#third tab
+with tab_3:
+    #52 week and career first, then the most recent seasons
+    times = ['52week', 'career'] + sorted([t for t in df['time'].unique() if t.isdigit()], reverse=True)
+    time_labels = {'52week' : '52 Week', 'career' : 'Career'}
+    profile_time = st.selectbox('Select Time Frame', times, format_func=lambda t: time_labels.get(t, t))
+
+    #percentiles only exist for a single slice, so averaged selections fall back to all surfaces and ranks
+    profile_surface = selected_surface[0] if len(selected_surface) == 1 else 'all'
+    profile_vs_rank = selected_vs_rank[0] if len(selected_vs_rank) == 1 else 'all'
+    profile = ranks.rating_profile(metric_choice, selected_players, profile_time, profile_surface, profile_vs_rank)
+
+    if not profile.empty:
+        fig_radar = px.line_polar(  #radar chart
+            profile,
+            r='Percentile',
+            theta='Stat',
+            color='PlayerName',
+            line_close=True,
+            range_r=[0, 100],
+            hover_data=['Rank', 'Ranked'],
+            title=f"{metric_axis_labels[metric_choice]} Percentiles, {time_labels.get(profile_time, profile_time)}",
+            labels={'PlayerName' : 'Player', 'Ranked' : 'Players Ranked'}
+        )
+        st.plotly_chart(fig_radar, use_container_width=True)
+    else:
+        st.info('No data found for the selected options.')
+
+    st.caption('Percentiles compare each player to everyone on the ATP leaderboard for the same time frame, surface and vs rank. ' \
+    '100 is the best in that group. For double faults fewer is better.')
+    if len(selected_surface) > 1 or len(selected_vs_rank) > 1:
+        st.caption('Percentiles are shown against all surfaces and ranks when more than one is selected.')
+
+
+
+
+#fourth tab
+with tab_4:
+    #every rating for every player, time, surface and vs rank sits in one array built per data version, so each grid is an index
+    rating_cube = cube.rating_cube()
+    heatmap_time = st.selectbox('Heatmap Time Frame', list(rating_cube.times), format_func=lambda t: time_labels.get(t, t))
+    heatmap_view = st.radio('Show', ['Rating', 'Difference From All Surfaces & Ranks'], horizontal=True)
+    show_diff = heatmap_view != 'Rating'
+
+    grid_players, grids = rating_cube.grids(selected_players, heatmap_time, metric_choice)
+    if show_diff:
+        grids = grids - grids[:, :1, :1]  #each cell minus the player's overall rating
+
+    if grid_players and not pd.isna(grids).all():
+        fig_heat = px.imshow(  #one heatmap per player
+            grids,
+            facet_col=0,
+            facet_col_wrap=3,
+            x=cube.vs_ranks,
+            y=cube.surfaces,
+            text_auto='.1f',
+            aspect='auto',
+            color_continuous_scale='RdBu' if show_diff else 'Viridis',
+            color_continuous_midpoint=0 if show_diff else None,
+            height=320 * ((len(grid_players) + 2) // 3) + 80,
+            title=f"{metric_axis_labels[metric_choice]} by Surface and Opponent Rank, {time_labels.get(heatmap_time, heatmap_time)}",
+            labels={'x' : 'Vs Rank', 'y' : 'Surface', 'color' : 'Difference' if show_diff else metric_axis_labels[metric_choice]}
+        )
+        #facet titles come out as facet_col=0, 1, ... so swap in the player names
+        fig_heat.for_each_annotation(lambda a: a.update(text=grid_players[int(a.text.split('=')[-1])]))
+        st.plotly_chart(fig_heat, use_container_width=True)
+    else:
+        st.info('No data found for the selected options.')
+
+    st.caption('Blank cells are combinations the ATP leaderboard has no rating for, usually too few matches against that rank on that surface.')
\ No newline at end of file
@@ -0,0 +1 @@
+#shared data loading and analytics helpers for the ATP Stats app
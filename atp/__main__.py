@@ -0,0 +1,3 @@
+from atp.cli import main
+
+main()
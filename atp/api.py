@@ -0,0 +1,185 @@
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from atp import cli, data, query
+
+
+#bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+
+def run_leaderboard(metric='Serve Rating', time='52week', surface='all', vs_rank='all', top=None):
+    return query.rating_leaderboard(data.read_ratings(metric), metric, time, surface, vs_rank, top)
+
+
+#path -> (query function, parameter types). list parameters accept a=x,y or a=x&a=y
+endpoints = {
+    '/leaderboard' : (run_leaderboard, {'metric': str, 'time': str, 'surface': str, 'vs_rank': str, 'top': int}),
+    '/ratings' : (cli.run_ratings, {'metric': str, 'players': list, 'surfaces': list, 'vs_ranks': list}),
+    '/individual' : (cli.run_individual, {'stats': list, 'players': list, 'times': list, 'countries': list, 'surfaces': list, 'top': int}),
+    '/win-loss' : (cli.run_win_loss, {'categories': list, 'players': list, 'time_periods': list, 'countries': list, 'min_wins': int, 'top': int})
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def parse_params(raw_query, types):
+    #turns the query string into keyword arguments. Lists are sorted since every filter is a set
+    params = {}
+    for key, values in parse_qs(raw_query).items():
+        if key not in types:
+            raise BadRequest(f'unknown parameter {key!r}. Options are {", ".join(types)}')
+        if types[key] is list:
+            params[key] = sorted({v.strip() for value in values for v in value.split(',') if v.strip()})
+        elif types[key] is int:
+            try:
+                params[key] = int(values[-1])
+            except ValueError:
+                raise BadRequest(f'{key} must be a whole number')
+            if key == 'top' and params[key] < 1:  #head() with a negative n drops rows from the end instead
+                raise BadRequest('top must be at least 1')
+        else:
+            params[key] = values[-1]
+    return params
+
+
+def cache_key(path, params):
+    #normalized query, so ?a=1&b=2 and ?b=2&a=1 share one cache entry
+    return path + '?' + json.dumps(params, sort_keys=True)
+
+
+class ResponseCache:
+    #least recently used cache of finished response bodies, shared by every request thread
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+def build_entry(version, frame):
+    #json body, its gzipped copy and an etag tied to the data version and the body
+    body = f'{{"data_version": "{version}", "count": {len(frame)}, "rows": {frame.to_json(orient="records")}}}'.encode()
+    compressed = gzip.compress(body, compresslevel=5) if len(body) >= GZIP_MIN_BYTES else None
+    etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:12]}"'
+    return {'body': body, 'gzip': compressed, 'etag': etag}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cache = ResponseCache()
+    quiet = False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/version':
+            return self.send_json(200, {'data_version': data.data_version(), 'endpoints': sorted(endpoints)})
+        if url.path not in endpoints:
+            return self.send_json(404, {'error': f'unknown path {url.path}', 'endpoints': sorted(endpoints)})
+
+        func, types = endpoints[url.path]
+        try:
+            params = parse_params(url.query, types)
+        except BadRequest as e:
+            return self.send_json(400, {'error': str(e)})
+
+        #version is part of the key, so a new dataset never serves old answers
+        version = data.data_version()
+        key = version + cache_key(url.path, params)
+        entry = self.cache.get(key)
+        hit = entry is not None
+        if not hit:
+            try:
+                entry = build_entry(version, func(**params))
+            except (KeyError, ValueError) as e:
+                return self.send_json(400, {'error': f'bad value: {e}'})
+            except FileNotFoundError as e:
+                return self.send_json(503, {'error': f'dataset missing: {e.filename}'})
+            self.cache.put(key, entry)
+
+        if entry['etag'] in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', entry['etag'])
+            self.send_header('X-Cache', 'HIT' if hit else 'MISS')
+            self.end_headers()
+            return
+
+        use_gzip = entry['gzip'] is not None and 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = entry['gzip'] if use_gzip else entry['body']
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', entry['etag'])
+        self.send_header('Cache-Control', 'no-cache')  #clients may keep it but must revalidate with the etag
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('X-Cache', 'HIT' if hit else 'MISS')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host='127.0.0.1', port=8600, cache_size=256, quiet=False):
+    Handler.cache = ResponseCache(cache_size)
+    Handler.quiet = quiet
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f'serving ATP data on http://{host}:{server.server_port} (data version {data.data_version()})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m atp.api', description='Local JSON API over the ATP datasets.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--cache-size', type=int, default=256, help='number of responses kept in memory')
+    parser.add_argument('--quiet', action='store_true', help='do not log every request')
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.cache_size, args.quiet)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import random
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+#a mix of what the pages ask for. Repeats on purpose so the response cache gets exercised
+default_paths = [
+    '/leaderboard?metric=Serve Rating&time=52week&top=50',
+    '/leaderboard?metric=Return Rating&time=2024&surface=Clay',
+    '/leaderboard?metric=Under Pressure Rating&time=career&vs_rank=Top10',
+    '/ratings?metric=Serve Rating&players=Roger Federer,Rafael Nadal,Novak Djokovic',
+    '/ratings?metric=Return Rating&players=Andy Murray&surfaces=Clay,Grass',
+    '/ratings?metric=Serve Rating',
+    '/win-loss?categories=all&time_periods=career&top=50',
+    '/win-loss?categories=clay,hard&time_periods=roll',
+    '/win-loss?countries=FRA,ESP&categories=clay',
+]
+
+
+def fetch(base_url, path, use_gzip, etags):
+    #one request. Sends the last etag seen for the path so 304s are counted too
+    url = base_url + urllib.request.quote(path, safe='/?=&,')
+    headers = {'Accept-Encoding': 'gzip'} if use_gzip else {}
+    if path in etags:
+        headers['If-None-Match'] = etags[path]
+    req = urllib.request.Request(url, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as resp:
+            size = len(resp.read())
+            status = resp.status
+            etags[path] = resp.headers.get('ETag', '')
+            cache = resp.headers.get('X-Cache', '')
+    except urllib.error.HTTPError as e:
+        size, status, cache = 0, e.code, e.headers.get('X-Cache', '')
+    return time.perf_counter() - start, status, size, cache
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(base_url, total, concurrency, use_gzip, revalidate, seed=0):
+    rng = random.Random(seed)
+    paths = [rng.choice(default_paths) for _ in range(total)]
+    etags = {}  #shared across threads. Only used when revalidating
+
+    def one(path):
+        return fetch(base_url, path, use_gzip, etags if revalidate else {})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, paths))
+    elapsed = time.perf_counter() - start
+
+    latencies = [r[0] * 1000 for r in results]
+    statuses = {}
+    for _, status, _, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    hits = sum(1 for r in results if r[3] == 'HIT')
+
+    print(f'requests: {total}  concurrency: {concurrency}  gzip: {use_gzip}  etag revalidation: {revalidate}')
+    print(f'throughput: {total / elapsed:.1f} req/s over {elapsed:.2f}s')
+    print(f'latency ms  p50: {percentile(latencies, 50):.1f}  p95: {percentile(latencies, 95):.1f}  '
+          f'p99: {percentile(latencies, 99):.1f}  mean: {statistics.mean(latencies):.1f}')
+    print(f'status codes: {dict(sorted(statuses.items()))}  cache hits: {hits / total:.0%}')
+    print(f'bytes received: {sum(r[2] for r in results):,}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m atp.api_loadtest', description='Load test a running atp.api server.')
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('-n', '--requests', type=int, default=500)
+    parser.add_argument('-c', '--concurrency', type=int, default=16)
+    parser.add_argument('--no-gzip', action='store_true', help='ask for uncompressed bodies')
+    parser.add_argument('--revalidate', action='store_true', help='send If-None-Match with the last etag seen')
+    args = parser.parse_args(argv)
+    run(args.url.rstrip('/'), args.requests, args.concurrency, not args.no_gzip, args.revalidate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import inspect
+import json
+import sys
+
+from atp import data, query
+
+
+#--------------
+# QUERIES
+#--------------
+#each query takes lists of filters and answers all of them in one filter/groupby pass,
+#so hundreds of players x stats cost the same as the dashboard answering one selection
+
+def run_ratings(metric='Serve Rating', players=None, surfaces=None, vs_ranks=None, years_only=True):
+    df = query.add_year(data.read_ratings(metric))
+    out = query.rating_lines(df, metric, players, surfaces or ['all'], vs_ranks or ['all'])
+    if years_only:
+        return out.dropna(subset=['year']).astype({'year': int})
+    return out.astype({'year': 'Int64'})  #career and 52 week rows have no year
+
+
+def run_individual(stats=None, players=None, times=None, countries=None, surfaces=None, top=None):
+    ind_df = query.clean_individual(data.read_individual())
+    out = query.filter_individual(ind_df, players, stats, times or ['career'], countries or ['all'], surfaces or ['all'])
+    out = query.combine_stats(out, ['PlayerName', 'Time', 'Country'], query.is_multi(surfaces or ['all']))
+    return query.top_per_stat(out, top)
+
+
+def run_win_loss(categories=None, players=None, time_periods=None, countries=None, min_wins=0, top=None):
+    w_l_df = query.clean_win_loss(data.read_win_loss())
+    out = query.filter_win_loss(w_l_df, players, categories or ['all'], time_periods or ['career'], countries or ['all'])
+    out = query.combine_categories(out, ['PlayerName', 'TimePeriod', 'Country'])
+    out = out[out['Win'] >= min_wins].sort_values(['TimePeriod', 'Country', 'Index'], ascending=[True, True, False])
+    if top is not None:
+        out = out.groupby(['TimePeriod', 'Country'], sort=False).head(top)
+    return out
+
+
+runners = {
+    'ratings' : run_ratings,
+    'individual' : run_individual,
+    'win-loss' : run_win_loss
+}
+
+#filters that take a list. A batch file may give a single value as a plain string
+list_options = ['players', 'stats', 'times', 'countries', 'surfaces', 'vs_ranks', 'categories', 'time_periods']
+
+
+#--------------
+# OUTPUT
+#--------------
+
+def write_frame(df, output):
+    #format is picked from the extension. '-' prints csv to the terminal
+    if output == '-':
+        df.to_csv(sys.stdout, index=False)
+    elif output.endswith('.parquet'):
+        df.to_parquet(output, index=False)  #needs pyarrow
+    else:
+        df.to_csv(output, index=False)
+
+
+def run_batch(path):
+    #json list of queries. Each one names its query type and output file, everything else is passed to the query
+    with open(path) as f:
+        batch = json.load(f)
+    for item in batch:
+        item = dict(item)
+        name = item.pop('query')
+        output = item.pop('output')
+        if name not in runners:
+            raise SystemExit(f'unknown query {name!r} in {path}. Options are {", ".join(runners)}')
+        options = inspect.signature(runners[name]).parameters
+        unknown = [key for key in item if key not in options]
+        if unknown:
+            raise SystemExit(f'unknown option {unknown[0]!r} for {name} in {path}. Options are {", ".join(options)}')
+        item = {key: [value] if key in list_options and isinstance(value, str) else value for key, value in item.items()}
+        write_frame(runners[name](**item), output)
+        print(f'{name}: wrote {output}', file=sys.stderr)
+
+
+#--------------
+# ARGUMENTS
+#--------------
+
+def read_players(args):
+    #players can be listed on the command line, in a file with one name per line, or both
+    players = list(args.players or [])
+    if args.players_file:
+        with open(args.players_file) as f:
+            players += [line.strip() for line in f if line.strip()]
+    return players or None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m atp', description='Run dashboard queries without the UI and save the results.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_common(p):
+        p.add_argument('--players', nargs='+', help='player names. Leave out for every player')
+        p.add_argument('--players-file', help='file with one player name per line')
+        p.add_argument('-o', '--output', default='-', help='.csv or .parquet file. Defaults to csv on stdout')
+
+    p = sub.add_parser('ratings', help='serve, return or pressure ratings by year')
+    p.add_argument('--metric', default='Serve Rating', choices=list(data.metric_col_map))
+    p.add_argument('--surfaces', nargs='+', help="Clay, Grass, Hard or all. Several are averaged")
+    p.add_argument('--vs-ranks', nargs='+', help="all, Top10, Top20 or Top50. Several are averaged")
+    add_common(p)
+
+    p = sub.add_parser('individual', help='individual match stats')
+    p.add_argument('--stats', nargs='+', help='stats such as Aces or 1st-Serve. Leave out for every stat')
+    p.add_argument('--times', nargs='+', help="career or years. Defaults to career")
+    p.add_argument('--countries', nargs='+', help="country codes or all. Defaults to all")
+    p.add_argument('--surfaces', nargs='+', help="Clay, Grass, Hard or all. Several are combined")
+    p.add_argument('--top', type=int, help='keep the top N players for each stat')
+    add_common(p)
+
+    p = sub.add_parser('win-loss', help='win/loss index')
+    p.add_argument('--categories', nargs='+', help="win/loss categories such as clay or vstop10. Several are combined")
+    p.add_argument('--time-periods', nargs='+', help="career, roll or ytd. Defaults to career")
+    p.add_argument('--countries', nargs='+', help="country codes or all. Defaults to all")
+    p.add_argument('--min-wins', type=int, default=0)
+    p.add_argument('--top', type=int, help='keep the top N players for each time period and country')
+    add_common(p)
+
+    p = sub.add_parser('batch', help='run a json file of queries')
+    p.add_argument('path')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'batch':
+        run_batch(args.path)
+        return
+
+    opts = {k: v for k, v in vars(args).items() if k not in ('command', 'output', 'players', 'players_file')}
+    opts['players'] = read_players(args)
+    write_frame(runners[args.command](**opts), args.output)
+
+
+if __name__ == '__main__':
+    main()
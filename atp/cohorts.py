@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+from atp import data
+
+
+#bucket edges for numeric bio attributes. np.digitize puts anything below the first edge in bucket 0
+height_bins = [175, 180, 185, 190, 195]  #cm
+age_bins = [21, 24, 27, 30, 33]  #years
+
+#attributes users can build cohorts from, mapped to the lookup column they come from
+cohort_attr_map = {
+    'Height' : 'HeightCm',
+    'Age' : 'BirthDate',
+    'Play Hand' : 'PlayHand',
+    'Backhand' : 'BackHand'
+}
+
+
+def bin_labels(bins, unit=''):
+    #[175, 180] -> ['<175', '175-179', '180+']
+    labels = [f'<{bins[0]}{unit}']
+    labels += [f'{lo}-{hi - 1}{unit}' for lo, hi in zip(bins[:-1], bins[1:])]
+    labels.append(f'{bins[-1]}+{unit}')
+    return labels
+
+
+def bucketize(values, bins):
+    #integer bucket code per value. Missing values get -1 so they drop out of every group
+    values = np.asarray(values, dtype=float)
+    codes = np.digitize(values, bins)
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def factorize(values):
+    codes, uniques = pd.factorize(pd.Series(values), sort=True)
+    return codes, [str(u) for u in uniques]
+
+
+def group_codes(code_arrays, sizes):
+    #collapses several code arrays into one flat group id. Rows with any missing code come back as -1
+    valid = np.ones(len(code_arrays[0]), dtype=bool)
+    for codes in code_arrays:
+        valid &= codes >= 0
+    flat = np.full(len(valid), -1, dtype=np.int64)
+    if valid.any():
+        flat[valid] = np.ravel_multi_index([codes[valid] for codes in code_arrays], sizes)
+    return flat
+
+
+def group_sums(flat, n_groups, values, weights=None):
+    #weighted sum, total weight and row count for every group in one bincount pass each
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    keep = (flat >= 0) & ~np.isnan(values) & ~np.isnan(weights)
+    idx = flat[keep]
+    total = np.bincount(idx, weights=values[keep] * weights[keep], minlength=n_groups)
+    weight = np.bincount(idx, weights=weights[keep], minlength=n_groups)
+    count = np.bincount(idx, minlength=n_groups)
+    return total, weight, count
+
+
+#-------------
+# BIO CODES
+#-------------
+
+@lru_cache(maxsize=4)
+def _bio_frame(version):
+    #one row per player with an integer code for every cohort attribute
+    lookup = data.read_lookup().drop_duplicates('PlayerId').set_index('PlayerId')
+    bio = pd.DataFrame(index=lookup.index)
+    labels = {}
+
+    height = lookup['HeightCm'].where(lookup['HeightCm'] > 0)  #a few players are listed at 0cm
+    bio['Height'] = bucketize(height, height_bins)
+    labels['Height'] = bin_labels(height_bins, 'cm')
+
+    #birth year is kept so age can be worked out per season
+    bio['BirthYear'] = pd.to_datetime(lookup['BirthDate'], errors='coerce').dt.year.astype(float)
+    bio['CurrentAge'] = lookup['Age']
+    labels['Age'] = bin_labels(age_bins)
+
+    for attr in ['Play Hand', 'Backhand']:
+        bio[attr], labels[attr] = factorize(lookup[cohort_attr_map[attr]])
+    return bio, labels
+
+
+def attribute_labels(attribute):
+    #group labels in bucket order, for ordering chart legends
+    return list(_bio_frame(data.data_version())[1][attribute])
+
+
+def _attr_codes(bio, rows, attr, ages):
+    #codes for one attribute lined up with the rows frame. Players missing from the lookup get -1
+    if attr == 'Age':
+        return bucketize(ages, age_bins)
+    codes = bio[attr].reindex(rows['PlayerId']).to_numpy()
+    return np.where(np.isnan(codes), -1, codes).astype(np.int64)
+
+
+def _cohort_frame(flat, sizes, labels, attrs, extra):
+    #turns flat group ids back into a tidy frame, keeping only groups that have rows
+    present = np.flatnonzero(extra['players'])
+    parts = np.unravel_index(present, sizes)
+    out = pd.DataFrame({attr: np.asarray(labels[attr], dtype=object)[part] for attr, part in zip(attrs, parts)})
+    for col, arr in extra.items():
+        out[col] = arr[present]
+    return out
+
+
+#-------------
+# RATINGS
+#-------------
+
+@lru_cache(maxsize=8)
+def _rating_rows(version, metric_choice):
+    #yearly rating rows only. 52 week and career rows have no season to chart
+    df = data.read_ratings(metric_choice)
+    years = pd.to_numeric(df['time'], errors='coerce')
+    rows = df.loc[years.notna(), ['PlayerId', 'surface', 'vs_rank', data.metric_col_map[metric_choice]]]
+    rows = rows.reset_index(drop=True)
+    rows['year'] = years.dropna().astype(int).to_numpy()
+    return rows
+
+
+@lru_cache(maxsize=64)
+def _rating_cohorts(version, metric_choice, attribute, split, surface, vs_rank):
+    rows = _rating_rows(version, metric_choice)
+    bio, labels = _bio_frame(version)
+    rows = rows[(rows['surface'] == surface) & (rows['vs_rank'] == vs_rank)]
+
+    birth_year = bio['BirthYear'].reindex(rows['PlayerId']).to_numpy()
+    ages = rows['year'].to_numpy() - birth_year  #age during that season
+
+    year_codes, year_labels = factorize(rows['year'])
+    labels = dict(labels, year=[int(y) for y in year_labels])
+    attrs = ['year', attribute] + ([split] if split else [])
+    code_arrays = [year_codes] + [_attr_codes(bio, rows, attr, ages) for attr in attrs[1:]]
+    sizes = [len(labels[attr]) for attr in attrs]
+
+    flat = group_codes(code_arrays, sizes)
+    total, weight, count = group_sums(flat, int(np.prod(sizes)), rows[data.metric_col_map[metric_choice]])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / weight
+    return _cohort_frame(flat, sizes, labels, attrs, {'value': mean.round(1), 'players': count})
+
+
+def rating_cohorts(metric_choice, attribute, split=None, surface='all', vs_rank='all'):
+    #average rating per season for each bio cohort, optionally split by a second attribute
+    return _rating_cohorts(data.data_version(), metric_choice, attribute, split, surface, vs_rank).copy()
+
+
+#-------------
+# WIN/LOSS INDEX
+#-------------
+
+@lru_cache(maxsize=4)
+def _win_loss_rows(version):
+    #country 'all' rows already hold every player, the per country rows would double count
+    df = data.read_win_loss()
+    df = df[(df['Country'] == 'all') & df['Index'].notna()]
+    return df[['PlayerId', 'Category', 'TimePeriod', 'Index', 'Win', 'Loss', 'Titles']].reset_index(drop=True)
+
+
+@lru_cache(maxsize=64)
+def _win_loss_cohorts(version, category, time_period, attribute, split):
+    rows = _win_loss_rows(version)
+    bio, labels = _bio_frame(version)
+    rows = rows[(rows['Category'] == category) & (rows['TimePeriod'] == time_period)]
+
+    ages = bio['CurrentAge'].reindex(rows['PlayerId']).to_numpy()  #no season here, so use today's age
+    attrs = [attribute] + ([split] if split else [])
+    code_arrays = [_attr_codes(bio, rows, attr, ages) for attr in attrs]
+    sizes = [len(labels[attr]) for attr in attrs]
+
+    flat = group_codes(code_arrays, sizes)
+    n_groups = int(np.prod(sizes))
+    matches = rows['Win'] + rows['Loss']
+    #same match weighted index the Win/Loss page uses
+    index_total, match_total, count = group_sums(flat, n_groups, rows['Index'], matches)
+    wins = group_sums(flat, n_groups, rows['Win'])[0]
+    losses = group_sums(flat, n_groups, rows['Loss'])[0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        index = index_total / match_total
+    return _cohort_frame(flat, sizes, labels, attrs, {
+        'Index': index.round(3),
+        'Win': wins.astype(int),
+        'Loss': losses.astype(int),
+        'players': count
+    })
+
+
+def win_loss_cohorts(category, time_period, attribute, split=None):
+    #match weighted win/loss index for each bio cohort, optionally split by a second attribute
+    return _win_loss_cohorts(data.data_version(), category, time_period, attribute, split).copy()
@@ -0,0 +1,64 @@
+import os
+import pandas as pd
+from functools import lru_cache
+
+from atp import data, query
+
+
+#written next to atp_win_loss_index.csv by atp.refresh, so a published version carries its aggregates with it
+COUNTRY_FILE = 'atp_country_win_loss.csv'
+
+country_keys = ['Country', 'Category', 'TimePeriod']
+
+#match weighted quantiles of player index within each country
+index_quantiles = {
+    'IndexP25' : 0.25,
+    'IndexMedian' : 0.5,
+    'IndexP75' : 0.75
+}
+
+
+def build_country_table(df):
+    #one row per (Country, Category, TimePeriod) with totals, player count and the spread of player index
+    #country 'all' holds every player, so it doubles as the tour wide baseline
+    df = df[df['Index'].notna()]
+    df = df.assign(Matches=df['Win'] + df['Loss'])
+    df = df[df['Matches'] > 0]
+
+    #same match weighted index the Win/Loss page uses when categories are combined
+    out = query.weighted_mean(df, country_keys, 'Index', extra=['Win', 'Loss', 'Titles']).set_index(country_keys)
+    out['Players'] = df.groupby(country_keys)['PlayerId'].nunique()
+
+    #weighted quantiles in one sorted pass: the first player whose running share of matches reaches q
+    df = df.sort_values(country_keys + ['Index'], kind='stable')
+    groups = df.groupby(country_keys, sort=False)['Matches']
+    share = groups.cumsum() / groups.transform('sum')
+    for col, q in index_quantiles.items():
+        out[col] = df[share >= q - 1e-9].groupby(country_keys)['Index'].first()
+
+    out['Index'] = out['Index'].round(3)
+    out = out.reset_index()
+    return out[country_keys + ['Players', 'Win', 'Loss', 'Titles', 'Matches', 'Index'] + list(index_quantiles)]
+
+
+@lru_cache(maxsize=2)
+def _country_table(version):
+    path = data.data_path(COUNTRY_FILE, version)
+    if os.path.exists(path):
+        table = pd.read_csv(path)
+    else:  #data_files and versions from before the aggregates existed
+        table = build_country_table(data.read_win_loss())
+    return table.set_index(country_keys).sort_index()
+
+
+def country_table():
+    #indexed by (Country, Category, TimePeriod). Shared, copy before mutating
+    return _country_table(data.data_version())
+
+
+def compare_countries(countries, categories, time_period):
+    #every requested country and category side by side in one reindex. Combinations with no matches are left out
+    index = pd.MultiIndex.from_product([list(countries), list(categories), [time_period]], names=country_keys)
+    out = country_table().reindex(index)
+    out = out[out['Matches'].notna()].reset_index()
+    return out.astype({'Players': int, 'Win': int, 'Loss': int, 'Matches': int})
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+from atp import data
+
+
+#fixed axis order, so charts always lay the grid out the same way
+surfaces = ['all', 'Clay', 'Grass', 'Hard']
+vs_ranks = ['all', 'Top10', 'Top20', 'Top50']
+metrics = list(data.rating_file_map)
+
+
+class RatingCube:
+    #every rating in one dense float32 array: player x time x surface x vs_rank x metric. Missing combinations are NaN.
+    #any slice the pages need is plain array indexing
+
+    def __init__(self, frames):
+        names = sorted(set().union(*[set(df['PlayerName'].dropna()) for df in frames.values()]))
+        years = sorted({t for df in frames.values() for t in df['time'].dropna().unique() if str(t).isdigit()})
+        self.players = pd.Index(names)
+        self.times = pd.Index(['52week', 'career'] + years)
+        self.values = np.full((len(self.players), len(self.times), len(surfaces), len(vs_ranks), len(metrics)), np.nan, dtype=np.float32)
+
+        for m, metric in enumerate(metrics):
+            df = frames[metric]
+            idx = [
+                self.players.get_indexer(df['PlayerName']),
+                self.times.get_indexer(df['time']),
+                pd.Index(surfaces).get_indexer(df['surface']),
+                pd.Index(vs_ranks).get_indexer(df['vs_rank']),
+            ]
+            keep = np.logical_and.reduce([i >= 0 for i in idx])
+            self.values[tuple(i[keep] for i in idx) + (m,)] = df[data.metric_col_map[metric]].to_numpy(dtype=np.float32)[keep]
+
+    def grids(self, players, time, metric):
+        #surface x vs_rank grid for each player that is in the cube, as (names, players x surfaces x vs_ranks)
+        pos = self.players.get_indexer(list(players))
+        pos = pos[pos >= 0]
+        t = self.times.get_loc(time)
+        return list(self.players[pos]), self.values[pos, t, :, :, metrics.index(metric)]
+
+
+@lru_cache(maxsize=2)
+def _rating_cube(version):
+    return RatingCube({metric: data.read_ratings(metric) for metric in metrics})
+
+
+def rating_cube():
+    #built once per data version from all three rating files
+    return _rating_cube(data.data_version())
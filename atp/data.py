@@ -0,0 +1,84 @@
+import os
+import hashlib
+from functools import lru_cache
+
+import pandas as pd
+
+
+#data_files sits next to this package, so paths work no matter where the app is launched from
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_files')
+
+#refreshed datasets are published here by atp.refresh, one folder per version. CURRENT names the live one.
+#until the first publish the app reads data_files directly
+VERSIONS_DIR = os.environ.get('ATP_DATA_VERSIONS', os.path.join(os.path.dirname(DATA_DIR), 'data_versions'))
+CURRENT_FILE = os.path.join(VERSIONS_DIR, 'CURRENT')
+
+#csv behind each rating the user can pick
+rating_file_map = {
+    'Serve Rating' : 'atp_serve_data.csv',
+    'Return Rating' : 'atp_return_data.csv',
+    'Under Pressure Rating' : 'atp_pressure_data.csv'
+}
+
+#rating column inside each csv
+metric_col_map = {
+    'Serve Rating' : 'ServeRating',
+    'Return Rating' : 'ReturnRating',
+    'Under Pressure Rating' : 'PressureRating'
+}
+
+
+def published_version():
+    #name of the live published version, or None before the first refresh. The pointer is swapped atomically, so this is never half written
+    try:
+        with open(CURRENT_FILE) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_dir(version):
+    #folder a version's files live in. Anything that is not a published version is a data_files fingerprint
+    if version and os.path.isdir(os.path.join(VERSIONS_DIR, version)):
+        return os.path.join(VERSIONS_DIR, version)
+    return DATA_DIR
+
+
+def data_path(file_name, version=None):
+    return os.path.join(version_dir(version or data_version()), file_name)
+
+
+def data_version():
+    #published versions are never edited in place, so their name is enough.
+    #otherwise a fingerprint of every file in data_files, which changes whenever a csv is replaced. Either way caches keyed on it never go stale
+    published = published_version()
+    if published and os.path.isdir(os.path.join(VERSIONS_DIR, published)):
+        return published
+    digest = hashlib.sha1()
+    for name in sorted(os.listdir(DATA_DIR)):
+        stat = os.stat(os.path.join(DATA_DIR, name))
+        digest.update(f'{name}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+#readers are cached per data version. Callers get shared frames and must copy before mutating.
+#room for two versions, so sessions still on the old one keep their frames while the new one loads
+@lru_cache(maxsize=12)
+def _read_csv(file_name, version):
+    return pd.read_csv(data_path(file_name, version))
+
+
+def read_ratings(metric_choice):
+    return _read_csv(rating_file_map[metric_choice], data_version())
+
+
+def read_lookup():
+    return _read_csv('atp_lookup.csv', data_version())
+
+
+def read_win_loss():
+    return _read_csv('atp_win_loss_index.csv', data_version())
+
+
+def read_individual():
+    return _read_csv('atp_player_stats.csv.gz', data_version())
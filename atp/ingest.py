@@ -0,0 +1,204 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+import pandas as pd
+
+
+#same endpoints and cleaning as atp_data_pull.qmd, limited to the slices that change day to day
+BASE_URL = 'https://www.atptour.com/en/-/www'
+HEADERS = {'User-Agent' : 'Mozilla/5.0'}
+
+stat_file_map = {
+    'serve' : 'atp_serve_data.csv',
+    'return' : 'atp_return_data.csv',
+    'pressure' : 'atp_pressure_data.csv'
+}
+
+surfaces = ['Clay', 'Grass', 'Hard', 'all']
+vs_ranks = ['all', 'Top10', 'Top20', 'Top50']
+win_loss_categories = ['all', 'after1stsetlost', 'after1stsetwin', 'finalset', '5thset', 'finals', 'grandslam', 'indoor', 'vslefthanders',
+                       'vsrighthanders', '1000', 'carpet', 'hard', 'grass', 'clay', 'outdoor', 'tiebreak', 'vstop10']
+
+#columns the leaderboard json has that never make it into the csvs
+leaderboard_drop = ['ScRelativeUrlPlayerProfile', 'ScRelativeUrlPlayerCountryFlag', 'PlayerWasThisYearEoyNumberOne', 'EventYearEoyNumberOne',
+                    'PartnerId', 'PartnerName', 'PartnerCountryCode']
+#slice keys stay as text, otherwise a year like '2025' turns into 2025.0
+leaderboard_keys = ['PlayerId', 'PlayerName', 'stat', 'time', 'surface', 'vs_rank']
+
+win_loss_columns = ['PlayerName', 'PlayerId', 'NatlId', 'Index', 'Titles', 'Win', 'Loss', 'Category', 'TimePeriod', 'Country']
+lookup_columns = ['PlayerName', 'PlayerId', 'BirthDate', 'Age', 'NatlId', 'Nationality', 'HeightFt', 'HeightIn', 'HeightCm', 'WeightLb',
+                  'WeightKg', 'PlayHand', 'BackHand', 'ProYear', 'Active', 'SglHiRank', 'CareerPrizeFormatted']
+
+
+def get_json(url, retries=3):
+    #None when the site has nothing for the url. Raises once the retries run out, so a flaky night fails instead of publishing gaps
+    import requests
+    for attempt in range(retries):
+        try:
+            response = requests.get(url, headers=HEADERS, timeout=10)
+            response.raise_for_status()
+            return response.json() or None
+        except requests.RequestException:
+            if attempt == retries - 1:
+                raise
+            time.sleep(2 ** attempt)  #increase wait time if multiple attempts
+
+
+def fetch_all(func, combos, workers=12):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda combo: func(*combo), combos))
+
+
+#--------------
+# LEADERBOARDS
+#--------------
+
+def fetch_leaderboard(stat, time_val, surface, vs_rank):
+    payload = get_json(f'{BASE_URL}/StatsLeaderboard/{stat}/{time_val}/{surface}/{vs_rank}/false?v=1')
+    leaderboard = payload.get('Leaderboard') if payload else None
+    if not leaderboard:
+        return None
+    df = pd.json_normalize(leaderboard)  #flattens nested stats data, named Stats.<column>
+    df['stat'] = stat
+    df['time'] = time_val
+    df['surface'] = surface
+    df['vs_rank'] = vs_rank
+    return df
+
+
+def clean_leaderboard(df):
+    df = df.drop(columns=[col for col in df.columns if col in leaderboard_drop or col.endswith('SortField')])
+    df.columns = df.columns.str.replace('Stats.', '', regex=False)
+    #percentages come through as '45.0%'
+    for col in df.columns.difference(leaderboard_keys):
+        if df[col].dtype == 'object' or pd.api.types.is_string_dtype(df[col]):
+            try:
+                df[col] = df[col].str.replace('%', '').str.strip().astype(float)
+            except (ValueError, AttributeError):
+                pass
+    df['PlayerName'] = df['PlayerName'].str.strip()
+    return df
+
+
+def leaderboard_slice(stat, times):
+    #every surface and vs rank for the given time frames of one stat
+    frames = fetch_all(fetch_leaderboard, product([stat], times, surfaces, vs_ranks))
+    frames = [df for df in frames if df is not None]
+    if not frames:
+        return None
+    return clean_leaderboard(pd.concat(frames, ignore_index=True))
+
+
+#--------------
+# WIN / LOSS
+#--------------
+
+def fetch_win_loss(category, time_period, country):
+    rows = get_json(f'{BASE_URL}/stats/winloss//{category}/{time_period}/{country}/index/desc/1/1000?v=1')
+    if not rows:
+        return None
+    df = pd.DataFrame(rows)
+    df['PlayerName'] = df['FirstName'] + ' ' + df['LastName'].str.strip()
+    df['Category'] = category
+    df['TimePeriod'] = time_period
+    df['Country'] = country
+    return df[win_loss_columns]
+
+
+def win_loss_slice(time_periods, countries):
+    #countries come from the current csv, which saves driving a browser for the dropdown like the full pull does
+    frames = fetch_all(fetch_win_loss, product(win_loss_categories, time_periods, countries))
+    frames = [df for df in frames if df is not None]
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+#--------------
+# BIOS
+#--------------
+
+def fetch_bio(player_id):
+    return get_json(f'{BASE_URL}/players/hero/{player_id}?v=1')
+
+
+def clean_bios(bios, player_ids):
+    bio = pd.DataFrame(bios)
+    bio['PlayerName'] = (bio['FirstName'] + ' ' + bio['LastName'].str.strip()).str.strip()
+    bio['PlayerId'] = player_ids
+    bio['BirthDate'] = pd.to_datetime(bio['BirthDate']).dt.date
+    for col in ['PlayHand', 'BackHand', 'Active']:
+        bio[col] = bio[col].apply(lambda x: x.get('Description') if isinstance(x, dict) else None)
+    for col in ['Age', 'HeightIn', 'HeightCm', 'WeightLb', 'WeightKg', 'SglHiRank', 'CareerPrizeFormatted']:
+        bio[col] = pd.to_numeric(bio[col].astype(str).str.replace(',', '').str.replace('$', ''), errors='coerce')
+    return bio.reindex(columns=lookup_columns)
+
+
+def new_bios(player_ids):
+    #bios only for players the lookup has never seen
+    player_ids = list(player_ids)
+    if not player_ids:
+        return None
+    bios = fetch_all(fetch_bio, [(pid,) for pid in player_ids])
+    found = [(bio, pid) for bio, pid in zip(bios, player_ids) if bio]
+    if not found:
+        return None
+    return clean_bios([bio for bio, _ in found], [pid for _, pid in found])
+
+
+#--------------
+# SLICES
+#--------------
+#a slice is (file name, fresh rows, column, values): the rows of the file where column is in values get swapped for the fresh ones
+
+def fetch_slices(times, time_periods, current_dir, bios=True):
+    slices = []
+    for stat, file_name in stat_file_map.items():
+        slices.append((file_name, leaderboard_slice(stat, times), 'time', times))
+
+    win_loss_file = os.path.join(current_dir, 'atp_win_loss_index.csv')
+    countries = sorted(pd.read_csv(win_loss_file, usecols=['Country'])['Country'].dropna().unique())
+    slices.append(('atp_win_loss_index.csv', win_loss_slice(time_periods, countries), 'TimePeriod', time_periods))
+
+    if bios:
+        known = set(pd.read_csv(os.path.join(current_dir, 'atp_lookup.csv'), usecols=['PlayerId'])['PlayerId'])
+        seen = set()
+        for _, df, _, _ in slices:
+            if df is not None:
+                seen |= set(df['PlayerId'].dropna())
+        slices.append(('atp_lookup.csv', new_bios(sorted(seen - known)), 'PlayerId', None))
+    return slices
+
+
+def local_slices(source_dir, times, time_periods):
+    #same slices cut from csvs already on disk, e.g. the output of atp_data_pull.qmd
+    slices = []
+    for file_name in stat_file_map.values():
+        df = pd.read_csv(os.path.join(source_dir, file_name), dtype={'time': str})
+        slices.append((file_name, df[df['time'].isin(times)], 'time', times))
+    df = pd.read_csv(os.path.join(source_dir, 'atp_win_loss_index.csv'))
+    slices.append(('atp_win_loss_index.csv', df[df['TimePeriod'].isin(time_periods)], 'TimePeriod', time_periods))
+    lookup = os.path.join(source_dir, 'atp_lookup.csv')
+    if os.path.exists(lookup):
+        slices.append(('atp_lookup.csv', pd.read_csv(lookup), 'PlayerId', None))
+    return slices
+
+
+def merge_slice(old, fresh, column, values):
+    #values None means upsert on column: fresh rows win, rows it does not mention stay
+    if fresh is None or fresh.empty:
+        return old
+    if values is None:
+        keep = old[~old[column].isin(fresh[column])]
+    else:
+        keep = old[~old[column].astype(str).isin([str(v) for v in values])]
+    return pd.concat([keep, fresh.reindex(columns=old.columns)], ignore_index=True)
+
+
+def default_times(today=None):
+    #52 week and the running season are the only rating slices that move day to day
+    year = (today or pd.Timestamp.today()).year
+    return ['52week', str(year)]
+
+
+default_time_periods = ['roll', 'ytd']
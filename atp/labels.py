@@ -0,0 +1,70 @@
+#display names shared by the pages, the CLI and anything else that shows ATP data to people
+
+#titles each graph
+title_map = {
+    'Serve Rating' : 'ATP Serve Rating Over Time',
+    'Return Rating' : 'ATP Return Rating Over Time',
+    'Under Pressure Rating' : 'ATP under Pressure Rating Over Time'
+}
+
+#y-axis labels for graphing
+metric_axis_labels = {
+    'Serve Rating' : 'Serve Rating',
+    'Return Rating' : 'Return Rating',
+    'Under Pressure Rating' : 'Pressure Rating'
+}
+
+# creating a subset of stats for each dataframe
+stat_map = {
+    'Serve Rating' : ['FirstServePct', 'FirstServePointsWonPct', 'SecondServePointsWonPct', 'ServiceGamesWonPct', 'AvgAcesPerMatch', 'AvgDblFaultsPerMatch'],
+    'Return Rating' : ['FirstServeReturnPointsWonPct', 'SecondServeReturnPointsWonPct', 'ReturnGamesWonPct', 'BrkPointsConvertedPct'],
+    'Under Pressure Rating' : ['BrkPointsConvertedPct', 'BrkPointsSavedPct', 'TieBreaksWonPct', 'DecidingSetsWonPct']
+}
+
+stat_label_map = {
+    'FirstServePct' : 'First Serve %',
+    'FirstServePointsWonPct' : 'First Serve Points Won %',
+    'SecondServePointsWonPct' : 'Second Serve Points Won %',
+    'ServiceGamesWonPct' : 'Service Games Won %',
+    'AvgAcesPerMatch' : 'Average Aces Per Match',
+    'AvgDblFaultsPerMatch' : 'Average Double Faults Per Match',
+    'FirstServeReturnPointsWonPct' : 'First Serve Return Points Won %',
+    'SecondServeReturnPointsWonPct' : 'Second Serve Return Points Won %',
+    'ReturnGamesWonPct' : 'Return Games Won %',
+    'BrkPointsConvertedPct' : 'Break Points Converted %',
+    'BrkPointsSavedPct' : 'Break Points Saved %',
+    'TieBreaksWonPct' : 'Tie Breaks Won %',
+    'DecidingSetsWonPct' : 'Deciding Sets Won %'
+}
+
+#changing win/loss category labels
+category_labels = {
+    'all' : 'All',
+    '1000': 'Masters 1000',
+    '5thset' : '5th Set',
+    'after1stsetwin' : 'After Winning 1st Set',
+    'carpet' : 'Carpet LOL',
+    'clay' : 'Clay',
+    'hard' : 'Hard',
+    'grass' : 'Grass',
+    'finals' : 'Finals',
+    'finalset' : 'Final Set',
+    'grandslam' : 'Grand Slams',
+    'indoor' : 'Indoors',
+    'outdoor' : 'Outdoors',
+    'tiebreak' : 'Tie Breaks',
+    'vslefthanders' : 'Vs Left Handers',
+    'vsrighthanders' : 'Vs Right Handers',
+    'vstop10' : 'Vs Top 10'
+}
+
+#changing win/loss time period labels
+time_period_labels = {
+    'all' : 'All',
+    'career' : 'Career',
+    'roll' : '52 Week',
+    'ytd' : 'Year to Date'
+}
+
+#default player set whenever nothing has been picked
+big_three = ['Roger Federer', 'Rafael Nadal', 'Novak Djokovic']
@@ -0,0 +1,240 @@
+import pandas as pd
+
+from atp import data
+
+
+#--------------
+# FILTER SELECTIONS
+#--------------
+
+def resolve_selection(sel, default_token='all', all_options=None):
+    #'all' style options are exclusive. Returns the selection a multiselect should hold after the user clicks
+    sel = list(sel)
+
+    if all_options and len(sel) > 1: #if more than one selection
+        selectable_options = set(all_options) - {default_token} #removes default from all options
+        if set(sel) == selectable_options: #if user has selected every option
+            return [default_token] #revert back to default
+
+    if default_token in sel and len(sel) > 1 and sel[-1] == default_token: #default picked last, so it wins
+        return [default_token]
+    if default_token in sel and len(sel) > 1: #another option picked while default is present, drop the default
+        return [x for x in sel if x != default_token]
+    if not sel: #empty falls back to default
+        return [default_token]
+    return sel
+
+
+def parse_top_n(option):
+    #'Top 10' -> 10, 'All' -> None
+    if option == 'All':
+        return None
+    return int(option.split()[1])
+
+
+def is_multi(sel, default_token='all'):
+    #more than one real option selected, meaning values have to be combined
+    return len(sel) > 1 and default_token not in sel
+
+
+def filter_all_or_isin(df, col, sel, default_token='all'):
+    #if 'all', only show 'all' rows. Otherwise show the selections
+    if default_token in sel:
+        return df[df[col] == default_token]
+    return df[df[col].isin(sel)]
+
+
+def weighted_mean(df, keys, value_col, weight_col='Matches', extra=None):
+    #match weighted average of value_col per group. extra columns are summed alongside
+    extra = extra or []
+    sums = (
+        df.assign(weighted_val=df[value_col] * df[weight_col]) #temporary helper column with product of value and weight
+        .groupby(keys, as_index=False)[['weighted_val', weight_col] + extra]
+        .sum()
+    )
+    sums[value_col] = sums['weighted_val'] / sums[weight_col] #dividing by total weight to get weighted value
+    return sums.drop(columns='weighted_val')
+
+
+#--------------
+# RATINGS (ATP_Stats.py)
+#--------------
+
+def add_year(df):
+    #four digit year as a number. Career and 52 week rows become NaN
+    return df.assign(year=df['time'].str.extract(r'(\d{4})', expand=False).astype(float))
+
+
+def rating_lines(df, metric_choice, players=None, surfaces=('all',), vs_ranks=('all',)):
+    #rating rows for the line chart. Multiple surfaces or vs ranks are averaged per player and year
+    out = filter_all_or_isin(df, 'surface', surfaces)
+    out = filter_all_or_isin(out, 'vs_rank', vs_ranks)
+    if players:
+        out = out[out['PlayerName'].isin(players)]
+
+    if is_multi(surfaces) or is_multi(vs_ranks):
+        out = out.groupby(['PlayerName', 'year'])[data.metric_col_map[metric_choice]].mean().reset_index()
+    return out
+
+
+def rating_leaderboard(df, metric_choice, time='52week', surface='all', vs_rank='all', top=None):
+    #one time slice ranked by rating, best first
+    col = data.metric_col_map[metric_choice]
+    out = df[(df['time'] == time) & (df['surface'] == surface) & (df['vs_rank'] == vs_rank)]
+    out = out.sort_values(col, ascending=False)
+    return out if top is None else out.head(top)
+
+
+#--------------
+# INDIVIDUAL STATS (pages/Individual_Stats.py)
+#--------------
+
+#which column holds the value for each stat
+y_col_map = {
+    "Aces": "Number",
+    "1st-Serve": "Percentage",
+    "1st-Serve-Points-Won": "Percentage",
+    "2nd-Serve-Points-Won": "Percentage",
+    "Service-Games-Won": "Percentage",
+    "Break-Points-Saved": "Percentage",
+    "1st-Serve-Return-Points-Won": "Percentage",
+    "2nd-Serve-Return-Points-Won": "Percentage",
+    "Break-Points-Converted": "Percentage",
+    "Return-Games-Won": "Percentage"
+}
+
+
+def stat_value_col(stat):
+    #default if not in dictionary
+    return y_col_map.get(stat, "Number")
+
+
+def clean_individual(df):
+    df = df.dropna(subset=["PlayerId"])
+    df = df[df['Matches'] >= 5].copy()   #only include players who played at least 5 matches
+
+    #ensuring proper formatting. This was an unecessarily easy fix to a lot of problems.
+    for col in ['Country', 'Surface', 'Time', 'Stat']:
+        df[col] = df[col].astype(str).str.strip()
+
+    #ensuring number column is clean and numeric
+    if 'Number' in df:
+        df['Number'] = (df['Number'].astype(str).str.replace(',', '', regex=False).str.strip().astype(float))
+
+    #ensuring percentage column is numeric
+    if 'Percentage' in df:
+        df['Percentage'] = (df['Percentage'].astype(str).str.replace('%', '', regex=False).str.strip().astype(float))
+    return df
+
+
+def filter_individual(df, players=None, stats=None, times=None, countries=None, surfaces=None):
+    #every argument is a list. Empty or None means no filter
+    if players:
+        df = df[df['PlayerName'].isin(players)]
+    if stats:
+        df = df[df['Stat'].isin(stats)]
+    if times:
+        df = df[df['Time'].isin(times)]
+    if countries:
+        df = df[df['Country'].isin(countries)]
+    if surfaces:
+        df = df[df['Surface'].isin(surfaces)]
+    return df
+
+
+def combine_stats(df, keys, needs_agg):
+    #aces are always summed. Percentages become a match weighted average when several surfaces are combined
+    #groups by Stat as well, so any number of stats go through in one pass
+    keys = ['Stat'] + list(keys)
+    is_number = df['Stat'].map(stat_value_col) == 'Number'
+    parts = []
+
+    number_df = df[is_number]
+    if not number_df.empty:
+        parts.append(number_df.groupby(keys, as_index=False).agg(Number=('Number', 'sum'), Matches=('Matches', 'sum')))
+
+    pct_df = df[~is_number]
+    if needs_agg and not pct_df.empty:
+        parts.append(weighted_mean(pct_df, keys, 'Percentage'))
+    elif not pct_df.empty:
+        parts.append(pct_df)
+
+    if not parts:
+        return df.iloc[0:0]
+    out = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    if 'Percentage' in out:
+        out = out.assign(Percentage=out['Percentage'].round(2))
+    return out
+
+
+def top_per_stat(df, top_n):
+    #highest value first within each stat, keeping the first top_n rows of each
+    value_cols = df['Stat'].map(stat_value_col)
+    value = pd.Series(float('nan'), index=df.index)
+    for col in ['Number', 'Percentage']:
+        if col in df:
+            value = value.mask(value_cols == col, df[col])
+    df = df.assign(_value=value)
+    df = df.sort_values(['Stat', '_value'], ascending=[True, False], kind='stable').drop(columns='_value')
+    if top_n is not None:
+        df = df.groupby('Stat', sort=False).head(top_n)
+    return df
+
+
+def rank_line_players(df_line, y_col, top_n):
+    #players with the best total over the whole line chart. Aces are summed, percentages weighted by matches
+    if y_col == 'Number':
+        ranking = df_line.groupby('PlayerName', as_index=False)[y_col].sum()
+    else:
+        ranking = weighted_mean(df_line, ['PlayerName'], y_col)
+    return ranking.sort_values(by=y_col, ascending=False).head(top_n)['PlayerName'].tolist()
+
+
+def line_players(df, selected_players, selected_countries, players, default_players=None):
+    #which players the line chart follows. Returns the list and whether defaults were used
+    country_players = []
+    if selected_countries and 'all' not in selected_countries: #if user selects a country
+        country_players = (
+            df.loc[df['Country'].isin(selected_countries), 'PlayerName'] #find all the players from that country
+            .dropna().unique().tolist() #create a list with each unique player
+        )
+    if selected_players:
+        if country_players: #show all the players from that country and the selected player
+            return list(set(selected_players) | set(country_players)), False
+        return list(selected_players), False
+    if country_players:
+        return country_players, False
+    return [p for p in (default_players or []) if p in players], True
+
+
+#--------------
+# WIN/LOSS INDEX (pages/Win_Loss_Index.py)
+#--------------
+
+def clean_win_loss(df):
+    df = df.dropna(subset=["Index"])
+    return df[df['Win'] + df['Loss'] > 1]
+
+
+def filter_win_loss(df, players=None, categories=None, time_periods=None, countries=None):
+    #every argument is a list of raw values. Empty or None means no filter
+    if players:
+        df = df[df['PlayerName'].isin(players)]
+    if categories:
+        df = df[df['Category'].isin(categories)]
+    if time_periods:
+        df = df[df['TimePeriod'].isin(time_periods)]
+    if countries:
+        df = df[df['Country'].isin(countries)]
+    return df
+
+
+def combine_categories(df, keys=('PlayerName',)):
+    #totals wins, losses and titles across categories with an Index weighted by matches played
+    out = (
+        df.assign(Matches=df['Win'] + df['Loss'])
+        .pipe(weighted_mean, list(keys), 'Index', extra=['Win', 'Loss', 'Titles'])
+        .drop(columns='Matches')
+    )
+    out['Index'] = out['Index'].round(3)
+    return out[list(keys) + ['Win', 'Loss', 'Titles', 'Index']]
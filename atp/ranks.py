@@ -0,0 +1,118 @@
+import pandas as pd
+from functools import lru_cache
+
+from atp import data, labels, query
+
+
+#stats where a smaller number is the better one
+lower_is_better = {'AvgDblFaultsPerMatch'}
+
+#slice every rating row is ranked within
+rating_keys = ['time', 'surface', 'vs_rank']
+individual_keys = ['Stat', 'Time', 'Surface', 'Country']
+
+
+def rank_columns(col):
+    return f'{col}Rank', f'{col}Pctile'
+
+
+def rank_within(df, keys, cols):
+    #rank 1 is the best in the slice. Percentile is the share of the slice at or below the player, so 100 is the best
+    out = pd.DataFrame(index=df.index)
+    groups = df.groupby(keys, sort=False)
+    higher = [c for c in cols if c not in lower_is_better]
+    lower = [c for c in cols if c in lower_is_better]
+    for subset, best_high in [(higher, True), (lower, False)]:
+        if not subset:
+            continue
+        ranks = groups[subset].rank(method='min', ascending=not best_high)
+        pctiles = groups[subset].rank(method='max', ascending=best_high, pct=True) * 100
+        for col in subset:
+            rank_col, pct_col = rank_columns(col)
+            out[rank_col] = ranks[col].astype('Int64')
+            out[pct_col] = pctiles[col].round(1)
+    out['Ranked'] = groups[keys[0]].transform('size')  #players in the slice
+    return out
+
+
+#-------------
+# RATINGS
+#-------------
+
+def rating_stat_cols(metric_choice, df):
+    #the rating first, then the stats that feed it
+    return [data.metric_col_map[metric_choice]] + [c for c in labels.stat_map[metric_choice] if c in df.columns]
+
+
+@lru_cache(maxsize=8)
+def _rating_ranks(version, metric_choice):
+    df = data.read_ratings(metric_choice)
+    cols = rating_stat_cols(metric_choice, df)
+    ranks = rank_within(df, rating_keys, cols)
+    ranks[['PlayerId'] + rating_keys] = df[['PlayerId'] + rating_keys]
+    return ranks.set_index(['PlayerId'] + rating_keys).sort_index()
+
+
+def rating_ranks(metric_choice):
+    #rank and percentile of every rating and stat, indexed by (PlayerId, time, surface, vs_rank). Shared, copy before mutating
+    return _rating_ranks(data.data_version(), metric_choice)
+
+
+def with_rating_ranks(df, metric_choice, cols=None):
+    #joins rank columns onto rating rows that still have their slice columns. Averaged rows have no slice and are returned as is
+    if df.empty or not set(['PlayerId'] + rating_keys) <= set(df.columns):
+        return df
+    ranks = rating_ranks(metric_choice)
+    if cols is not None:
+        ranks = ranks[[c for col in cols for c in rank_columns(col)] + ['Ranked']]
+    return df.join(ranks, on=['PlayerId'] + rating_keys)
+
+
+def rating_profile(metric_choice, players, time='52week', surface='all', vs_rank='all'):
+    #long frame of percentiles for the radar chart. One row per player and stat in the slice
+    ranks = rating_ranks(metric_choice)
+    df = data.read_ratings(metric_choice)
+    ids = df.loc[df['PlayerName'].isin(players), ['PlayerId', 'PlayerName']].drop_duplicates('PlayerId')
+    cols = rating_stat_cols(metric_choice, df)
+    try:
+        sliced = ranks.xs((time, surface, vs_rank), level=rating_keys)
+    except KeyError:
+        return pd.DataFrame(columns=['PlayerName', 'Stat', 'Percentile', 'Rank', 'Ranked'])
+    sliced = sliced.join(ids.set_index('PlayerId'), how='inner')
+    rows = []
+    for col in cols:
+        rank_col, pct_col = rank_columns(col)
+        rows.append(pd.DataFrame({
+            'PlayerName': sliced['PlayerName'],
+            'Stat': labels.stat_label_map.get(col, labels.metric_axis_labels.get(metric_choice, col)),
+            'Percentile': sliced[pct_col],
+            'Rank': sliced[rank_col],
+            'Ranked': sliced['Ranked']
+        }))
+    return pd.concat(rows, ignore_index=True).dropna(subset=['Percentile'])
+
+
+#-------------
+# INDIVIDUAL STATS
+#-------------
+
+@lru_cache(maxsize=2)
+def _individual_ranks(version):
+    df = query.clean_individual(data.read_individual())
+    #aces live in Number, every other stat in Percentage
+    is_number = df['Stat'].map(query.stat_value_col) == 'Number'
+    df = df.assign(Value=df['Number'].where(is_number, df['Percentage']))
+    ranks = rank_within(df, individual_keys, ['Value'])
+    ranks = ranks.rename(columns={'ValueRank': 'Rank', 'ValuePctile': 'Percentile'})
+    ranks[individual_keys + ['PlayerName']] = df[individual_keys + ['PlayerName']]
+    ranks = ranks.set_index(individual_keys + ['PlayerName']).sort_index()
+    return ranks[~ranks.index.duplicated()]  #one row per player, so joins never fan out
+
+
+def individual_ranks(stat, time, surface):
+    #rank and percentile of every player for one stat, time and surface, indexed by (Country, PlayerName)
+    ranks = _individual_ranks(data.data_version())
+    try:
+        return ranks.xs((stat, time, surface), level=['Stat', 'Time', 'Surface'])
+    except KeyError:
+        return ranks.iloc[0:0].droplevel(['Stat', 'Time', 'Surface'])
@@ -0,0 +1,361 @@
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from atp import countries, data, ingest
+
+
+STAGING_DIR = os.path.join(data.VERSIONS_DIR, 'staging')
+REJECTED_DIR = os.path.join(data.VERSIONS_DIR, 'rejected')
+LOCK_FILE = os.path.join(data.VERSIONS_DIR, 'refresh.lock')
+
+#a refresh that shrinks a file or a slice below this share of what it replaces is treated as a bad pull
+MIN_ROW_RATIO = 0.8
+#a lock older than this was left by a refresh that died
+STALE_LOCK_SECONDS = 6 * 3600
+
+
+class ValidationError(Exception):
+    pass
+
+
+class RefreshBusy(RuntimeError):
+    pass
+
+
+def new_version_name(now=None):
+    #sorts by time, so the newest version is always the last one
+    return (now or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+
+
+def list_versions():
+    if not os.path.isdir(data.VERSIONS_DIR):
+        return []
+    return sorted(name for name in os.listdir(data.VERSIONS_DIR)
+                  if name[:8].isdigit() and os.path.isdir(os.path.join(data.VERSIONS_DIR, name)))
+
+
+#--------------
+# STAGING
+#--------------
+
+def link_or_copy(src, dst):
+    #unchanged files are hard linked between versions, so keeping a few around costs almost no disk.
+    #files from data_files are copied, since someone may overwrite those in place
+    if os.path.dirname(os.path.abspath(src)) != os.path.abspath(data.DATA_DIR):
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def stage(version, slices, current_dir):
+    #builds the whole next version in staging. Files without fresh rows are carried over untouched
+    stage_dir = os.path.join(STAGING_DIR, version)
+    os.makedirs(stage_dir)
+    changed = {}
+    for file_name, fresh, column, values in slices:
+        old = changed.get(file_name)
+        if old is None:
+            old = pd.read_csv(os.path.join(current_dir, file_name), dtype={'time': str} if column == 'time' else None)
+        changed[file_name] = ingest.merge_slice(old, fresh, column, values)
+
+    #derived tables are rebuilt from the staged data every time, never carried over or linked
+    win_loss = changed.get('atp_win_loss_index.csv')
+    if win_loss is None:
+        win_loss = pd.read_csv(os.path.join(current_dir, 'atp_win_loss_index.csv'))
+    changed[countries.COUNTRY_FILE] = countries.build_country_table(win_loss)
+
+    for file_name in os.listdir(current_dir):
+        if file_name not in changed:
+            link_or_copy(os.path.join(current_dir, file_name), os.path.join(stage_dir, file_name))
+    for file_name, df in changed.items():
+        df.to_csv(os.path.join(stage_dir, file_name), index=False)
+    return stage_dir
+
+
+#--------------
+# VALIDATION
+#--------------
+
+#file -> (key columns that must be unique, columns that must be filled in, percentage columns)
+file_rules = {
+    'atp_serve_data.csv' : (['PlayerId', 'time', 'surface', 'vs_rank'], ['PlayerId', 'PlayerName', 'ServeRating'],
+                            ['FirstServePct', 'FirstServePointsWonPct', 'SecondServePointsWonPct', 'ServiceGamesWonPct']),
+    'atp_return_data.csv' : (['PlayerId', 'time', 'surface', 'vs_rank'], ['PlayerId', 'PlayerName', 'ReturnRating'],
+                             ['FirstServeReturnPointsWonPct', 'SecondServeReturnPointsWonPct', 'ReturnGamesWonPct', 'BrkPointsConvertedPct']),
+    'atp_pressure_data.csv' : (['PlayerId', 'time', 'surface', 'vs_rank'], ['PlayerId', 'PlayerName', 'PressureRating'],
+                               ['BrkPointsConvertedPct', 'BrkPointsSavedPct', 'TieBreaksWonPct', 'DecidingSetsWonPct']),
+    'atp_win_loss_index.csv' : (['PlayerId', 'Category', 'TimePeriod', 'Country'], ['PlayerId', 'Win', 'Loss'], []),
+    'atp_lookup.csv' : (['PlayerId'], ['PlayerId', 'PlayerName'], []),
+    countries.COUNTRY_FILE : (countries.country_keys, ['Players', 'Win', 'Loss', 'Index'], [])
+}
+
+
+def check_file(file_name, new, old, refreshed):
+    #shape checks cover the whole file. Value checks only cover the refreshed rows, since history is whatever the site had at the time
+    problems = []
+    if set(new.columns) != set(old.columns):
+        problems.append(f'{file_name}: columns changed to {sorted(new.columns)}')
+        return problems
+    if len(new) < MIN_ROW_RATIO * len(old):
+        problems.append(f'{file_name}: {len(new)} rows, down from {len(old)}')
+
+    keys, required, pcts = file_rules.get(file_name, ([], [], []))
+    if keys and new.duplicated(keys).any():
+        problems.append(f'{file_name}: {new.duplicated(keys).sum()} duplicate rows on {", ".join(keys)}')
+    fresh = new[refreshed]
+    for col in required:
+        if fresh[col].isna().any():
+            problems.append(f'{file_name}: {fresh[col].isna().sum()} refreshed rows missing {col}')
+    for col in pcts:
+        values = pd.to_numeric(fresh[col], errors='coerce')
+        if ((values < 0) | (values > 100)).any():
+            problems.append(f'{file_name}: refreshed {col} outside 0-100')
+    if file_name == 'atp_win_loss_index.csv':
+        if ((fresh['Win'] < 0) | (fresh['Loss'] < 0)).any():
+            problems.append(f'{file_name}: negative Win or Loss')
+        if ((fresh['Index'] < 0) | (fresh['Index'] > 1)).any():
+            problems.append(f'{file_name}: Index outside 0-1')
+    return problems
+
+
+def check_slice(file_name, new, old, column, values):
+    #each refreshed slice should be about as big as the one it replaced. A new season starts from nothing, so empty old slices pass
+    problems = []
+    for value in values:
+        n_new = (new[column].astype(str) == str(value)).sum()
+        n_old = (old[column].astype(str) == str(value)).sum()
+        if n_new < MIN_ROW_RATIO * n_old:
+            problems.append(f'{file_name}: {column}={value} has {n_new} rows, down from {n_old}')
+    return problems
+
+
+def validate(stage_dir, current_dir, slices):
+    #reads the staged files back from disk, so a bad write is caught as well as a bad pull
+    problems = []
+    for file_name in sorted(os.listdir(current_dir)):
+        if not os.path.exists(os.path.join(stage_dir, file_name)):
+            problems.append(f'{file_name}: missing from the new version')
+    for file_name, fresh, column, values in slices:
+        if fresh is None or fresh.empty:
+            continue
+        try:
+            new = pd.read_csv(os.path.join(stage_dir, file_name))
+        except (ValueError, pd.errors.ParserError) as e:
+            problems.append(f'{file_name}: unreadable ({e})')
+            continue
+        old = pd.read_csv(os.path.join(current_dir, file_name))
+        if values is None:
+            refreshed = new[column].isin(fresh[column])
+        else:
+            refreshed = new[column].astype(str).isin([str(v) for v in values])
+            problems += check_slice(file_name, new, old, column, values)
+        problems += check_file(file_name, new, old, refreshed)
+
+    #derived tables are rebuilt whole, so every row counts as refreshed. The first version to have one has nothing to compare to
+    new = pd.read_csv(os.path.join(stage_dir, countries.COUNTRY_FILE))
+    old_path = os.path.join(current_dir, countries.COUNTRY_FILE)
+    old = pd.read_csv(old_path) if os.path.exists(old_path) else new.iloc[0:0]
+    problems += check_file(countries.COUNTRY_FILE, new, old, pd.Series(True, index=new.index))
+    if problems:
+        raise ValidationError('\n'.join(problems))
+
+
+#--------------
+# PUBLISH
+#--------------
+
+def set_current(version):
+    #the pointer is written to a temp file and renamed over the old one, so readers see the old name or the new one, never a mix
+    tmp = data.CURRENT_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, data.CURRENT_FILE)
+
+
+def publish(stage_dir):
+    version = os.path.basename(stage_dir)
+    os.replace(stage_dir, os.path.join(data.VERSIONS_DIR, version))
+    set_current(version)
+    return version
+
+
+def reject(stage_dir):
+    os.makedirs(REJECTED_DIR, exist_ok=True)
+    target = os.path.join(REJECTED_DIR, os.path.basename(stage_dir))
+    os.replace(stage_dir, target)
+    return target
+
+
+def collect_garbage(keep=3):
+    #drops all but the newest versions. The live one is always kept, and so is the one before it,
+    #since a session may have read the old pointer a moment before the swap
+    versions = list_versions()
+    current = data.published_version()
+    keep_set = set(versions[-max(keep, 2):]) | {current}
+    removed = []
+    for version in versions:
+        if version not in keep_set:
+            shutil.rmtree(os.path.join(data.VERSIONS_DIR, version))
+            removed.append(version)
+    for folder in [STAGING_DIR, REJECTED_DIR]:
+        if not os.path.isdir(folder):
+            continue
+        old = sorted(os.listdir(folder))
+        old = old[:-keep] if folder == REJECTED_DIR else old  #staging leftovers are from refreshes that died part way
+        for name in old:
+            shutil.rmtree(os.path.join(folder, name))
+            removed.append(os.path.join(os.path.basename(folder), name))
+    return removed
+
+
+class RefreshLock:
+    #one refresh at a time across processes. O_EXCL works the same on every platform
+
+    def __enter__(self):
+        os.makedirs(data.VERSIONS_DIR, exist_ok=True)
+        try:
+            if time.time() - os.path.getmtime(LOCK_FILE) > STALE_LOCK_SECONDS:
+                os.remove(LOCK_FILE)
+        except OSError:
+            pass
+        try:
+            fd = os.open(LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise RefreshBusy(f'another refresh is running (remove {LOCK_FILE} if it is not)')
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return self
+
+    def __exit__(self, *exc):
+        os.remove(LOCK_FILE)
+
+
+def refresh(times=None, time_periods=None, source=None, bios=True, keep=3, log=print):
+    #one incremental refresh: pull the moving slices, stage, validate, publish, clean up. Returns the new version or None
+    times = times or ingest.default_times()
+    time_periods = time_periods or ingest.default_time_periods
+    with RefreshLock():
+        current_dir = data.version_dir(data.data_version())
+        start = time.perf_counter()
+        if source:
+            slices = ingest.local_slices(source, times, time_periods)
+        else:
+            slices = ingest.fetch_slices(times, time_periods, current_dir, bios)
+        log(f'pulled {sum(len(df) for _, df, _, _ in slices if df is not None):,} rows in {time.perf_counter() - start:.1f}s')
+
+        stage_dir = stage(new_version_name(), slices, current_dir)
+        try:
+            validate(stage_dir, current_dir, slices)
+        except ValidationError as e:
+            log(f'rejected, kept in {reject(stage_dir)}:\n{e}')
+            return None
+        version = publish(stage_dir)
+        log(f'published {version}')
+        for name in collect_garbage(keep):
+            log(f'removed {name}')
+        return version
+
+
+#--------------
+# SCHEDULER
+#--------------
+
+def next_run(at, now=None):
+    #next local time of day matching 'HH:MM'
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in at.split(':'))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+def schedule(at='06:00', **kwargs):
+    #runs refresh once a day. A failed pull is logged and retried the next day, the live version stays as it is
+    while True:
+        run = next_run(at)
+        print(f'next refresh at {run:%Y-%m-%d %H:%M}', flush=True)
+        time.sleep(max(0, (run - datetime.now()).total_seconds()))
+        try:
+            refresh(**kwargs)
+        except Exception as e:  #network errors, a site change, a full disk. None of them should stop tomorrow's run
+            print(f'refresh failed: {e.__class__.__name__}: {e}', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m atp.refresh',
+        description='Refresh the current season slices, publish them as a new data version and clean up old versions.'
+    )
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_refresh_args(p):
+        p.add_argument('--times', nargs='+', help='rating time frames to refresh (default: 52week and the current year)')
+        p.add_argument('--time-periods', nargs='+', help=f'win/loss time periods to refresh (default: {" ".join(ingest.default_time_periods)})')
+        p.add_argument('--source', help='take the slices from csvs in this folder instead of the ATP site')
+        p.add_argument('--no-bios', dest='bios', action='store_false', help='skip fetching bios for new players')
+        p.add_argument('--keep', type=int, default=3, help='published versions to keep')
+
+    add_refresh_args(sub.add_parser('run', help='refresh once now'))
+    p = sub.add_parser('schedule', help='refresh once a day, forever')
+    p.add_argument('--at', default='06:00', help='local time of day, HH:MM')
+    add_refresh_args(p)
+    sub.add_parser('status', help='list published versions')
+    p = sub.add_parser('rollback', help='point the app at an older version')
+    p.add_argument('version', nargs='?', help='version to go back to (default: the one before the live one)')
+    p = sub.add_parser('gc', help='remove old versions')
+    p.add_argument('--keep', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.command in ('run', 'schedule'):
+        kwargs = {'times': args.times, 'time_periods': args.time_periods, 'source': args.source, 'bios': args.bios, 'keep': args.keep}
+        if args.command == 'run':
+            try:
+                version = refresh(**kwargs)
+            except RefreshBusy as e:
+                raise SystemExit(str(e))
+            sys.exit(0 if version else 1)
+        schedule(args.at, **kwargs)
+    elif args.command == 'status':
+        current = data.published_version()
+        print(f'live: {data.data_version()}' + ('' if current else ' (data_files, nothing published yet)'))
+        for version in list_versions():
+            print(f'{"*" if version == current else " "} {version}')
+    elif args.command == 'rollback':
+        versions = list_versions()
+        current = data.published_version()
+        target = args.version
+        if target is None:
+            older = [v for v in versions if current and v < current]
+            if not older:
+                raise SystemExit('no older version to roll back to')
+            target = older[-1]
+        if target not in versions:
+            raise SystemExit(f'unknown version {target}')
+        try:
+            with RefreshLock():  #a refresh publishing at the same moment would undo the rollback
+                set_current(target)
+        except RefreshBusy as e:
+            raise SystemExit(str(e))
+        print(f'live: {target}')
+    elif args.command == 'gc':
+        try:
+            with RefreshLock():  #a running refresh is still writing into staging
+                removed = collect_garbage(args.keep)
+        except RefreshBusy as e:
+            raise SystemExit(str(e))
+        for name in removed:
+            print(f'removed {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+
+from atp import data, query
+
+
+class SeriesIndex:
+    #yearly rows sorted by (player, year) with an int year column. Player i owns rows offsets[i]:offsets[i + 1],
+    #so a player's years are one contiguous sorted run and a year range is two searchsorted calls.
+    #by_year holds the same positions ordered by year, for year ranges over every player
+
+    def __init__(self, df, player_col, time_col):
+        years = pd.to_numeric(df[time_col], errors='coerce')  #career and 52 week rows drop out here, once
+        frame = df[years.notna()].assign(year=years.dropna().astype(int))
+        frame = frame.sort_values([player_col, 'year'], kind='stable').reset_index(drop=True)
+        codes, players = pd.factorize(frame[player_col], sort=True)
+        self.frame = frame
+        self.players = pd.Index(players)
+        self.offsets = np.searchsorted(codes, np.arange(len(players) + 1))
+        self.years = frame['year'].to_numpy()
+        self.by_year = np.argsort(self.years, kind='stable')
+        self.sorted_years = self.years[self.by_year]
+
+    def year_bounds(self):
+        if not len(self.years):
+            return None, None
+        return int(self.years.min()), int(self.years.max())
+
+    def rows(self, players, start=None, end=None):
+        #positions of every row for these players with start <= year <= end. None is every player
+        if players is None:
+            first = np.searchsorted(self.sorted_years, start, 'left') if start is not None else 0
+            last = np.searchsorted(self.sorted_years, end, 'right') if end is not None else len(self.years)
+            return np.sort(self.by_year[first:last])  #back in (player, year) order
+        positions = self.players.get_indexer(list(players))
+        parts = []
+        for pos in positions[positions >= 0]:
+            lo, hi = self.offsets[pos], self.offsets[pos + 1]
+            years = self.years[lo:hi]
+            first = lo + (np.searchsorted(years, start, 'left') if start is not None else 0)
+            last = lo + (np.searchsorted(years, end, 'right') if end is not None else hi - lo)
+            parts.append(np.arange(first, last))
+        return np.concatenate(parts) if parts else np.array([], dtype=np.int64)
+
+    def range(self, players, start=None, end=None):
+        return self.frame.iloc[self.rows(players, start, end)]
+
+
+@lru_cache(maxsize=4)
+def _rating_series(version, metric_choice):
+    return SeriesIndex(data.read_ratings(metric_choice), 'PlayerName', 'time')
+
+
+def rating_series(metric_choice):
+    #yearly rating rows of every surface and vs rank, indexed by player. Built once per data version
+    return _rating_series(data.data_version(), metric_choice)
+
+
+@lru_cache(maxsize=2)
+def _individual_series(version):
+    return SeriesIndex(query.clean_individual(data.read_individual()), 'PlayerName', 'Time')
+
+
+def individual_series():
+    #yearly individual stat rows of every stat, surface and country, indexed by player. Built once per data version
+    return _individual_series(data.data_version())
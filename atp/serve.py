@@ -0,0 +1,20 @@
+import os
+import sys
+
+from atp import data, warmup
+
+
+def main(argv=None):
+    #same as `streamlit run ATP_Stats.py`, but the data and chart caches are full before the first visitor arrives
+    argv = sys.argv[1:] if argv is None else argv
+    thread = warmup.start()
+
+    from streamlit.web import cli as stcli  #imports while the caches fill
+    #the port only opens once warm-up is done. A visitor arriving earlier would build the same tables next to the warm-up thread
+    thread.join()
+    sys.argv = ['streamlit', 'run', os.path.join(os.path.dirname(data.DATA_DIR), 'ATP_Stats.py')] + list(argv)
+    sys.exit(stcli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from atp import data
+from atp.api_loadtest import percentile
+
+
+ROOT = os.path.dirname(data.DATA_DIR)
+FINISHED_EARLY_FOR_RERUN = 2  #ForwardMsg.ScriptFinishedStatus for st.rerun() inside the script. Another run follows
+
+
+#--------------
+# INTERACTIONS
+#--------------
+#widget label -> what an analyst does with it. Every page uses the same handful of widget types
+
+def change_selectbox(widget, value, rng):
+    return rng.choice([o for o in widget['options'] if o != value] or widget['options'])
+
+
+def change_multiselect(widget, value, rng):
+    #mostly add an option, sometimes drop one, the way people build up a comparison
+    if value and rng.random() < 0.3:
+        return [v for v in value if v != rng.choice(value)]
+    return list(value) + [rng.choice([o for o in widget['options'] if o not in value] or widget['options'])]
+
+
+changers = {
+    'selectbox' : change_selectbox,
+    'radio' : change_selectbox,
+    'multiselect' : change_multiselect
+}
+
+#url path of each page -> (share of sessions, widget labels that get clicked)
+pages = {
+    '' : (0.4, ['Select Metric', 'Select Player(s)', 'Select Surface(s)', 'Select Vs Rank(s)', 'Select Stat', 'Select Time Frame',
+                'Heatmap Time Frame', 'Show']),
+    'Win_Loss_Index' : (0.3, ['Select Player(s)', 'Select Categories', 'Select Time Period', 'Select Countries',
+                              'Select # of Players to be Displayed']),
+    'Individual_Stats' : (0.3, ['Select Player(s)', 'Select Stats(s)', 'Select Time', 'Select Surface(s)',
+                                'Select # of players to be displayed']),
+    'Cohorts' : (0.1, ['Compare', 'Group Players By', 'Split By', 'Select Metric']),
+    'Country_Comparison' : (0.1, ['Select Countries', 'Select Categories', 'Select Time Period', 'Show']),
+}
+
+
+def available_pages():
+    #the individual stats page needs a csv that is not always shipped with the repo
+    out = dict(pages)
+    if not os.path.exists(data.data_path('atp_player_stats.csv.gz')):
+        out.pop('Individual_Stats')
+    return out
+
+
+#--------------
+# SESSION CLIENT
+#--------------
+
+class Session:
+    #one browser tab talking the Streamlit websocket protocol. Keeps widget values between reruns like the frontend does
+
+    def __init__(self, url, page):
+        self.url = url
+        self.page = page
+        self.page_hash = ''
+        self.widgets = {}  #label -> {'id', 'kind', 'options', 'value'}
+        self.errors = 0
+
+    async def __aenter__(self):
+        import websockets
+        ws_url = self.url.replace('http', 'ws', 1) + '/_stcore/stream'
+        self.ws = await websockets.connect(ws_url, subprotocols=['streamlit'], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, widget_states=()):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = self.page_hash
+        msg.rerun_script.page_name = self.page
+        msg.rerun_script.widget_states.widgets.extend(widget_states)
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        await self.read_until_finished()
+        return time.perf_counter() - start
+
+    async def read_until_finished(self):
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof('type')
+            if kind == 'navigation' and not self.page_hash:
+                self.page_hash = self.find_page_hash(msg.navigation.app_pages)
+            elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                self.read_element(msg.delta.new_element)
+            elif kind == 'script_finished' and msg.script_finished != FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def find_page_hash(self, app_pages):
+        for page in app_pages:
+            if page.url_pathname == self.page or (not self.page and page.is_default):
+                return page.page_script_hash
+        return ''
+
+    def read_element(self, element):
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+        if kind not in changers:
+            return
+        proto = getattr(element, kind)
+        old = self.widgets.get(proto.label)
+        options = list(proto.options)
+        if kind == 'multiselect':
+            value = list(proto.raw_values) if proto.set_value else (old['value'] if old else [options[i] for i in proto.default])
+        else:
+            default = options[proto.default] if options and proto.HasField('default') else None
+            value = proto.raw_value if proto.set_value else (old['value'] if old else default)
+        self.widgets[proto.label] = {'id': proto.id, 'kind': kind, 'options': options, 'value': value}
+
+    def widget_states(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+        states = []
+        for widget in self.widgets.values():
+            if widget['value'] is None:
+                continue
+            state = WidgetState(id=widget['id'])
+            if widget['kind'] == 'multiselect':
+                state.string_array_value.data[:] = widget['value']
+            else:
+                state.string_value = widget['value']
+            states.append(state)
+        return states
+
+    async def click(self, labels, rng):
+        #changes one widget that is on screen and reruns. Returns None when nothing could be clicked
+        labels = [label for label in labels if label in self.widgets and self.widgets[label]['options']]
+        if not labels:
+            return None
+        widget = self.widgets[rng.choice(labels)]
+        widget['value'] = changers[widget['kind']](widget, widget['value'], rng)
+        return await self.rerun(self.widget_states())
+
+
+async def run_session(url, page, labels, reruns, think, seed):
+    rng = random.Random(seed)
+    latencies = []
+    async with Session(url, page) as session:
+        latencies.append(await session.rerun())  #first page load
+        for _ in range(reruns):
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+            latency = await session.click(labels, rng)
+            if latency is not None:
+                latencies.append(latency)
+    return latencies, session.errors
+
+
+#--------------
+# SERVER
+#--------------
+
+def rss_mb(pid):
+    #resident memory of the server process
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return int(subprocess.check_output(['ps', '-o', 'rss=', '-p', str(pid)])) / 1024
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return float('nan')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(port):
+    #headless streamlit on a spare port. Waits for the health check before returning
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', 'ATP_Stats.py', '--server.headless', 'true',
+         '--server.port', str(port), '--browser.gatherUsageStats', 'false'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(120):
+        try:
+            with urllib.request.urlopen(url + '/_stcore/health', timeout=1):
+                return proc, url
+        except OSError:
+            time.sleep(0.5)
+    proc.kill()
+    raise SystemExit('streamlit server did not start')
+
+
+#--------------
+# REPORT
+#--------------
+
+async def run_level(url, pid, n_sessions, reruns, think, seed):
+    rng = random.Random(seed)
+    choices = available_pages()
+    names = list(choices)
+    plan = rng.choices(names, [choices[name][0] for name in names], k=n_sessions)
+
+    rss_before = rss_mb(pid) if pid else float('nan')
+    peak = [rss_before]
+    done = asyncio.Event()
+
+    async def sample_memory():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_mb(pid))
+            await asyncio.sleep(0.1)
+
+    sampler = asyncio.create_task(sample_memory()) if pid else None
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_session(url, page, choices[page][1], reruns, think, seed + i) for i, page in enumerate(plan)
+    ])
+    elapsed = time.perf_counter() - start
+    done.set()
+    if sampler:
+        await sampler
+
+    latencies = [lat * 1000 for lats, _ in results for lat in lats]
+    return {
+        'sessions': n_sessions,
+        'reruns': len(latencies),
+        'errors': sum(err for _, err in results),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'mean_ms': statistics.mean(latencies),
+        'reruns_per_s': len(latencies) / elapsed,
+        'rss_mb': rss_mb(pid) if pid else float('nan'),
+        'peak_rss_mb': peak[0],
+        'rss_growth_mb': peak[0] - rss_before,
+    }
+
+
+columns = ['sessions', 'reruns', 'errors', 'p50_ms', 'p95_ms', 'mean_ms', 'reruns_per_s', 'rss_mb', 'peak_rss_mb', 'rss_growth_mb']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m atp.session_loadtest',
+        description='Simulate concurrent dashboard sessions over websockets and report rerun latency, throughput and server memory as sessions grow.'
+    )
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32], help='session counts to try, in order')
+    parser.add_argument('--reruns', type=int, default=10, help='interactions per session after the first page load')
+    parser.add_argument('--think', type=float, default=0.5, help='average seconds between interactions')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='use an already running app instead of starting one')
+    parser.add_argument('--pid', type=int, help='process id of the --url server, for memory readings')
+    parser.add_argument('--csv', help='also write the results table to this csv')
+    args = parser.parse_args(argv)
+
+    if 'Individual_Stats' not in available_pages():
+        print('note: atp_player_stats.csv.gz not found, skipping the Individual Stats page', file=sys.stderr)
+
+    proc = None
+    if args.url:
+        url, pid = args.url.rstrip('/'), args.pid
+    else:
+        proc, url = start_server(free_port())
+        pid = proc.pid
+    print(f'server {url}  idle rss: {rss_mb(pid) if pid else float("nan"):.1f} MB')
+
+    rows = []
+    try:
+        print(' '.join(f'{c:>13}' for c in columns))
+        for n in args.sessions:
+            row = asyncio.run(run_level(url, pid, n, args.reruns, args.think, args.seed))
+            rows.append(row)
+            print(' '.join(f'{row[c]:>13.1f}' if isinstance(row[c], float) else f'{row[c]:>13}' for c in columns), flush=True)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+    if args.csv:
+        import pandas as pd
+        pd.DataFrame(rows, columns=columns).to_csv(args.csv, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import importlib
+import re
+import subprocess
+import sys
+import threading
+import time
+
+from atp import data
+
+
+#step name -> seconds it took, filled in by the warm-up thread
+timings = {}
+
+_lock = threading.Lock()
+_thread = None
+
+
+def _import(name):
+    return lambda: importlib.import_module(name)
+
+
+def _first_figure():
+    #plotly loads templates and validators on the first figure, which costs more than the import
+    import pandas as pd
+    import plotly.express as px
+    px.line(pd.DataFrame({'x': [0, 1], 'y': [0, 1]}), x='x', y='y').to_json()
+
+
+def _cohorts():
+    from atp import cohorts
+    cohorts.attribute_labels('Height')
+
+
+def _ranks():
+    from atp import ranks
+    for metric in data.rating_file_map:
+        ranks.rating_ranks(metric)
+
+
+def _individual_ranks():
+    from atp import ranks
+    ranks._individual_ranks(data.data_version())
+
+
+def _series():
+    from atp import series
+    for metric in data.rating_file_map:
+        series.rating_series(metric)
+
+
+def _individual_series():
+    from atp import series
+    series.individual_series()
+
+
+def _cube():
+    from atp import cube
+    cube.rating_cube()
+
+
+def _countries():
+    from atp import countries
+    countries.country_table()
+
+
+def steps():
+    #everything the first visitor to any page would otherwise wait on
+    out = [
+        ('import plotly.express', _import('plotly.express')),
+        ('import statsmodels', _import('statsmodels.api')),  #used by the OLS trendline on the scatter plot
+        ('import streamlit emojis', _import('streamlit.emojis')),  #page_icon is checked against a large emoji regex, compiled on import
+        ('first plotly figure', _first_figure),
+    ]
+    out += [(f'read {metric}', lambda metric=metric: data.read_ratings(metric)) for metric in data.rating_file_map]
+    out += [
+        ('read lookup', data.read_lookup),
+        ('read win/loss', data.read_win_loss),
+        ('read individual stats', data.read_individual),
+        ('cohort codes', _cohorts),
+        ('rank tables', _ranks),
+        ('individual rank tables', _individual_ranks),
+        ('rating time series', _series),
+        ('individual time series', _individual_series),
+        ('rating cube', _cube),
+        ('country win/loss totals', _countries),
+    ]
+    return out
+
+
+def warm():
+    for name, step in steps():
+        start = time.perf_counter()
+        try:
+            step()
+        except (ImportError, FileNotFoundError) as e:  #optional pieces. The page that needs them reports the problem
+            timings[name] = f'skipped ({e.__class__.__name__})'
+            continue
+        except Exception as e:  #a bad file should not stop the other steps. The page hits the same error and shows it
+            timings[name] = f'failed ({e.__class__.__name__})'
+            continue
+        timings[name] = time.perf_counter() - start
+
+
+def start():
+    #starts the warm-up once per process. Safe to call from every page on every rerun
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=warm, name='atp-warmup', daemon=True)
+            _thread.start()
+    return _thread
+
+
+#--------------
+# PROFILING
+#--------------
+
+def import_profile(module, top=15):
+    #runs the import in a fresh interpreter with -X importtime and returns the slowest modules by self time
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+        if match:
+            rows.append((int(match.group(1)), int(match.group(2)), match.group(4)))
+    total = max((cumulative for _, cumulative, _ in rows), default=0)
+    return total, sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m atp.warmup', description='Time every cold start step the app goes through.')
+    parser.add_argument('--imports', nargs='*', default=None, metavar='MODULE',
+                        help='also profile these imports with -X importtime (defaults to streamlit, plotly.express, statsmodels.api)')
+    parser.add_argument('--top', type=int, default=15, help='modules to list per import profile')
+    args = parser.parse_args(argv)
+
+    start_time = time.perf_counter()
+    warm()
+    print(f'{"step":<32}{"seconds":>10}')
+    for name, seconds in timings.items():
+        print(f'{name:<32}{seconds:>10.3f}' if isinstance(seconds, float) else f'{name:<32}{seconds:>10}')
+    print(f'{"total":<32}{time.perf_counter() - start_time:>10.3f}')
+
+    if args.imports is not None:
+        for module in args.imports or ['streamlit', 'plotly.express', 'statsmodels.api']:
+            total, rows = import_profile(module, args.top)
+            print(f'\nimport {module}: {total / 1e6:.3f}s cumulative. Slowest by self time (ms):')
+            for self_us, cumulative_us, name in rows:
+                print(f'  {self_us / 1000:>8.1f}  {cumulative_us / 1000:>9.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()
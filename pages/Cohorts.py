@@ -0,0 +1,116 @@
+import streamlit as st
+
+from atp import cohorts, labels, warmup
+
+st.set_page_config(
+    page_title="Cohorts",
+    page_icon="🎾",
+    layout="wide"
+)
+
+#loads the other datasets and plotly in the background the first time any page runs
+warmup.start()
+
+#title
+st.title('Player Cohorts')
+st.caption('Groups players by height, age, playing hand, and backhand using the ATP player bios, then compares how each group performs. ' \
+'Height and age are grouped into buckets.')
+
+#sidebar title
+st.sidebar.header('Filters')
+
+
+#display labels for win/loss categories and time periods. 'all' is not a real time period in the data
+category_labels = labels.category_labels
+category_label_to_values = {v: k for k, v in category_labels.items()}
+
+time_period_labels = {k: v for k, v in labels.time_period_labels.items() if k != 'all'}
+time_period_label_to_value = {v: k for k, v in time_period_labels.items()}
+
+
+#--------------
+# CREATING FILTERS
+#--------------
+
+#which dataset the cohorts are built from
+view = st.sidebar.radio('Compare', ['Ratings', 'Win/Loss Index'])
+
+attributes = list(cohorts.cohort_attr_map)
+
+#main grouping
+attribute = st.sidebar.selectbox('Group Players By', attributes)
+
+#optional second grouping. Cannot be the same as the first
+split_label = st.sidebar.selectbox('Split By', ['None'] + [a for a in attributes if a != attribute])
+split = None if split_label == 'None' else split_label
+
+
+#plotly is only imported once there is a chart to draw, so the filters show up first
+import plotly.express as px
+
+#---------------------
+# RATINGS COHORTS
+#---------------------
+if view == 'Ratings':
+    metric_choice = st.sidebar.selectbox(
+        'Select Metric',
+        ['Serve Rating', 'Return Rating', 'Under Pressure Rating']
+    )
+    surface = st.sidebar.selectbox('Select Surface', ['all', 'Clay', 'Grass', 'Hard'])
+    vs_rank = st.sidebar.selectbox('Select Vs Rank', ['all', 'Top10', 'Top20', 'Top50'])
+
+    cohort_df = cohorts.rating_cohorts(metric_choice, attribute, split, surface, vs_rank)
+
+    if not cohort_df.empty:
+        fig = px.line(
+            cohort_df,
+            x='year',
+            y='value',
+            color=attribute,
+            facet_col=split,  #one panel per split group
+            facet_col_wrap=2,
+            hover_data=['players'],
+            category_orders={attribute: cohorts.attribute_labels(attribute)},
+            title=f"{metric_choice} by {attribute} Over Time",
+            labels={'year': 'Year',
+                    'value': metric_choice,
+                    'players': 'Players'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption('Each line is the average rating of every ranked player in that group for the season. Hover to see how many players are in the group. ' \
+        'Age is the age a player was during that season.')
+    else:
+        st.write("No Data to Display")
+
+
+#---------------------
+# WIN/LOSS COHORTS
+#---------------------
+else:
+    category_label = st.sidebar.selectbox('Select Category', list(category_labels.values()))
+    time_period_label = st.sidebar.selectbox('Select Time Period', list(time_period_labels.values()))
+
+    cohort_df = cohorts.win_loss_cohorts(
+        category_label_to_values[category_label],
+        time_period_label_to_value[time_period_label],
+        attribute,
+        split
+    )
+
+    if not cohort_df.empty:
+        fig = px.bar(
+            cohort_df,
+            x=attribute,
+            y='Index',
+            color=split,
+            barmode='group',
+            category_orders={attribute: cohorts.attribute_labels(attribute)},
+            hover_data=['Win', 'Loss', 'players'],
+            title=f"Win/Loss Index by {attribute} ({category_label}, {time_period_label})",
+            labels={'players': 'Players'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        st.caption('Index is weighted by matches played, the same way the Win/Loss Index page combines categories. ' \
+        'Age is each player\'s age today, not during the time period, so career records of retired players count toward the oldest group.')
+    else:
+        st.write("No Data To Display")
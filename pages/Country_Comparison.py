@@ -0,0 +1,106 @@
+import streamlit as st
+
+from atp import countries, labels, warmup
+
+st.set_page_config(
+    page_title="Country Comparison",
+    page_icon="🎾",
+    layout="wide"
+)
+
+#loads the other datasets and plotly in the background the first time any page runs
+warmup.start()
+
+#title
+st.title('Country Comparison')
+st.caption('Compares nations on the Win/Loss Index by adding up every player from each country. ' \
+'Pick any countries and categories to see them side by side. All is every player on tour.')
+
+#sidebar title
+st.sidebar.header('Filters')
+
+#per country totals, built once per data version (or read from the published version)
+country_df = countries.country_table().reset_index()
+
+
+# -------------
+# FILTER OPTIONS: Countries, Categories, Time Period
+# ------------
+
+#'all' reads as 'All', the same as on the Win/Loss Index page
+def country_label(c):
+    return 'All' if c == 'all' else c
+
+country_options = sorted(country_df['Country'].unique(), key=lambda c: (c != 'all', c))
+
+#default is the tour plus the five countries with the most players
+biggest = (
+    country_df[(country_df['Category'] == 'all') & (country_df['TimePeriod'] == 'career') & (country_df['Country'] != 'all')]
+    .nlargest(5, 'Players')['Country'].tolist()
+)
+
+category_labels = labels.category_labels
+category_options = sorted(country_df['Category'].unique(), key=lambda c: (c != 'all', category_labels.get(c, c)))
+
+#'all' is not a real time period in the data
+time_period_labels = {k: v for k, v in labels.time_period_labels.items() if k != 'all'}
+
+
+#--------------
+# CREATING FILTERS
+#--------------
+
+selected_countries = st.sidebar.multiselect('Select Countries', country_options, default=['all'] + biggest, format_func=country_label)
+
+selected_categories = st.sidebar.multiselect('Select Categories', category_options, default=['all', 'clay', 'hard', 'grass'],
+                                             format_func=lambda c: category_labels.get(c, c))
+
+selected_time_period = st.sidebar.selectbox('Select Time Period', list(time_period_labels), format_func=time_period_labels.get)
+
+#what the bars show
+value_labels = {
+    'Index' : 'Win/Loss Index',
+    'Titles' : 'Titles',
+    'Players' : 'Players'
+}
+value_col = st.sidebar.radio('Show', list(value_labels), format_func=value_labels.get)
+
+
+#one vectorized lookup for every country and category picked
+compare_df = countries.compare_countries(selected_countries, selected_categories, selected_time_period)
+compare_df['Country'] = compare_df['Country'].map(country_label)
+compare_df['Category'] = compare_df['Category'].map(lambda c: category_labels.get(c, c))
+
+
+#plotly is only imported once there is a chart to draw, so the filters show up first
+import plotly.express as px
+
+#---------------------
+# Plotting bar chart
+#---------------------
+if not compare_df.empty:
+    fig = px.bar(
+        compare_df,
+        x='Country',
+        y=value_col,
+        color='Category',
+        barmode='group',
+        category_orders={'Country': [country_label(c) for c in selected_countries]},
+        hover_data=['Players', 'Win', 'Loss', 'Titles', 'IndexP25', 'IndexMedian', 'IndexP75'],
+        title=f"{value_labels[value_col]} by Country ({time_period_labels[selected_time_period]})",
+        labels={'Index': 'Win/Loss Index',
+                'IndexP25': '25th Percentile Player',
+                'IndexMedian': 'Median Player',
+                'IndexP75': '75th Percentile Player'}
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption('A country\'s index is every match its players won divided by every match they played, so players with more matches count for more. ' \
+    'The percentile columns show the spread between a country\'s players, also weighted by matches.')
+
+    st.dataframe(
+        compare_df.drop(columns=['TimePeriod']).rename(columns={'IndexP25': 'Index 25th Pct', 'IndexMedian': 'Index Median', 'IndexP75': 'Index 75th Pct'}),
+        hide_index=True,
+        use_container_width=True
+    )
+else:
+    st.write("No Data To Display")
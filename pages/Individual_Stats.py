@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from atp import data, labels, query, ranks, series, warmup
 
 
 
@@ -10,6 +10,9 @@ st.set_page_config(
     layout="wide"
 )
 
+#loads the other datasets and plotly in the background the first time any page runs
+warmup.start()
+
 
 
 #Title
@@ -18,30 +21,8 @@ st.title('Individual Stats')
 #sidebar title
 st.sidebar.header('Filters')
 
-#cached data to speed up reloads
-@st.cache_data(ttl=3600) #refresh every hour
-def load_data_individual():
-    return pd.read_csv('data_files/atp_player_stats.csv.gz')
-
-ind_df = load_data_individual()
-ind_df = ind_df.dropna(subset=["PlayerId"])
-ind_df = ind_df[ind_df['Matches'] >= 5]   #only include players who played at least 5 matches
-
-
-#ensuring proper formatting. This was an unecessarily easy fix to a lot of problems.
-ind_df['Country'] = ind_df['Country'].astype(str).str.strip()
-ind_df['Surface'] = ind_df['Surface'].astype(str).str.strip()
-ind_df['Time'] = ind_df['Time'].astype(str).str.strip()
-ind_df['Stat'] = ind_df['Stat'].astype(str).str.strip()
-
-
-#ensuring number column is clean and numeric
-if 'Number' in ind_df:
-    ind_df['Number'] = (ind_df['Number'].astype(str).str.replace(',', '', regex=False).str.strip().astype(float))
-
-#ensuring percentage column is numeric
-if 'Percentage' in ind_df:
-    ind_df['Percentage'] = (ind_df['Percentage'].astype(str).str.replace('%', '', regex=False).str.strip().astype(float))
+#cached in atp.data until the csv changes. Cleaning keeps players with at least 5 matches and makes the number columns numeric
+ind_df = query.clean_individual(data.read_individual())
 
 # -------------
 # FILTER OPTIONS: Players, Stats, Time Periods, Countries, Surface
@@ -72,21 +53,7 @@ if 'ind_selected_surfaces' not in st.session_state:
 
 
 def update_category(key, default_token, all_options=None): #function that takes in session state key, default filter option. All options are all possible filter options
-    sel = st.session_state[key] #current selection from user
-
-    if all_options and len(sel) > 1: #if more than one selection
-        selectable_options = set(all_options) - {default_token} #removes default from all options
-
-        if set(sel) == selectable_options: #if user has selected every option
-            st.session_state[key] = [default_token]  #revert back to default
-            return
-    
-    if default_token in sel and len(sel) > 1 and sel[-1] == default_token:  #if default is selected, there's more than one selection, and the default was the last selection
-        st.session_state[key] = [default_token] #revert back to the default
-    elif default_token in sel and len(sel) > 1: #if default and another option selected
-        st.session_state[key] = [x for x in sel if x != default_token] #selection is most recent selection. Gets rid of default if another option selected
-    elif not sel: #if filter is empty
-        st.session_state[key] = [default_token] #revert back to default
+    st.session_state[key] = query.resolve_selection(st.session_state[key], default_token, all_options)
 
 
 
@@ -127,86 +94,27 @@ selected_surfaces = st.sidebar.multiselect('Select Surface(s)',
                                            on_change=lambda: update_category('ind_selected_surfaces', 'all', surfaces)
                                            )
 
-#new df for filtering
-filtered_df = ind_df.copy()
-
-
-
-
-
 #creating filter logic
-if selected_players:
-    filtered_df = filtered_df[filtered_df['PlayerName'].isin(selected_players)]
-if selected_stat:
-    filtered_df = filtered_df[filtered_df['Stat'] == selected_stat]
-if selected_time:
-    filtered_df = filtered_df[filtered_df['Time'] == selected_time]
-if selected_countries:
-    filtered_df = filtered_df[filtered_df['Country'].isin(selected_countries)]
-if selected_surfaces:
-    filtered_df = filtered_df[filtered_df['Surface'].isin(selected_surfaces)]
+filtered_df = query.filter_individual(
+    ind_df,
+    players=selected_players,
+    stats=[selected_stat],
+    times=[selected_time],
+    countries=selected_countries,
+    surfaces=selected_surfaces
+)
 
 
 
 #creating dynamic Y-axis
-y_col_map = {
-    "Aces": "Number",
-    "1st-Serve": "Percentage",
-    "1st-Serve-Points-Won": "Percentage",
-    "2nd-Serve-Points-Won": "Percentage",
-    "Service-Games-Won": "Percentage",
-    "Break-Points-Saved": "Percentage",
-    "1st-Serve-Return-Points-Won": "Percentage",
-    "2nd-Serve-Return-Points-Won": "Percentage",
-    "Break-Points-Converted": "Percentage",
-    "Return-Games-Won": "Percentage"
-}
+y_col = query.stat_value_col(selected_stat)
 
 
-#default if not in dictionary
-y_col = y_col_map.get(selected_stat, "Number")
 
 
 
-
-
-#-----
-# new filters for 2nd tab, line chart
-#-----
-filtered_df_line = ind_df.copy()
-
-
-if selected_stat: #stats filter
-    filtered_df_line = filtered_df_line[filtered_df_line['Stat'] == selected_stat]
-if selected_surfaces: #surfaces filter
-    filtered_df_line = filtered_df_line[filtered_df_line['Surface'].isin(selected_surfaces)]
-    
-#Exclude career stats for the time-series chart
-filtered_df_line = filtered_df_line[filtered_df_line['Time'] != 'career']
-
-
-defaults_applied = False  #indicates if defaults are selected, which means no user selection
-default_line_players = ['Roger Federer', 'Rafael Nadal', 'Novak Djokovic'] #big three players as default for line chart
-country_players = [] #initializing players countries list
-
-if selected_countries and 'all' not in selected_countries: #if user selects a country
-    country_players = (
-        ind_df.loc[ind_df['Country'].isin(selected_countries), 'PlayerName'] #find all the players from that country
-        .dropna().unique().tolist() #create a list with each unique player
-    )
-if selected_players: #if a player is selected by user
-    if country_players: #if a country is also selected
-        players_for_line = list(set(selected_players) | set(country_players)) #show all the players from that country and the selected player
-    else: #otherwise just show selected players
-        players_for_line = selected_players      
-elif country_players: #if country is selected
-    players_for_line = country_players #show players from that country
-else:
-    players_for_line = [p for p in default_line_players if p in players] #line chart will show default (big three)
-    defaults_applied = True  #indicator now shows defaults are selected
-
-#filter for line chart to show players based on users selection above
-filtered_df_line = filtered_df_line[filtered_df_line['PlayerName'].isin(players_for_line)]
+#players from the selected countries are added to selected players. Falls back to the Big Three
+players_for_line, defaults_applied = query.line_players(ind_df, selected_players, selected_countries, players, labels.big_three)
 
 
 
@@ -218,39 +126,8 @@ needs_agg = (
     (len(selected_surfaces) > 1 and 'all' not in selected_surfaces)
 )
 
-#ensuring aces will sum correctly. Had some problems with this
-if selected_stat == 'Aces':
-    filtered_df = (
-        filtered_df.groupby(['PlayerName', 'Country'], as_index=False)
-        .agg(Number=('Number', 'sum'), Matches=('Matches', 'sum'))
-    )
-    #for line chart
-    filtered_df_line = (
-        filtered_df_line.groupby(['PlayerName', 'Time', 'Country'], as_index=False)
-        .agg(Number=('Number', 'sum'), Matches=('Matches', 'sum'))
-    )
-elif needs_agg and y_col == 'Percentage':
-    filtered_df = (
-        filtered_df
-        .assign(weighted_val=lambda d: d[y_col] * d['Matches']) #temporary helper column with product of percetange and matches
-        .groupby(['PlayerName', 'Country'], as_index=False)
-        .agg(weighted_val=('weighted_val', 'sum'), Matches=('Matches', 'sum')) #summing total percentages and matches
-        .assign(**{y_col: lambda d: d['weighted_val'] / d['Matches']}) #dividing by total matches to determine weighted percentage
-        .drop(columns=['weighted_val'])
-    )
-    #for line chart
-    filtered_df_line = ( 
-        filtered_df_line
-        .assign(weighted_val=lambda d: d[y_col] * d['Matches']) #temporary helper column with product of percetange and matches
-        .groupby(['PlayerName', 'Time', 'Country'], as_index=False)
-        .agg(weighted_val=('weighted_val', 'sum'), Matches=('Matches', 'sum')) #summing total percentages and matches
-        .assign(**{y_col: lambda d: d['weighted_val'] / d['Matches']}) #dividing by total matches to determine weighted percentage
-        .drop(columns=['weighted_val'])
-    )
-
-if y_col == 'Percentage':
-    filtered_df[y_col] = filtered_df[y_col].round(2)
-    filtered_df_line[y_col] = filtered_df_line[y_col].round(2)
+#aces are summed, percentages are weighted by matches when more than one surface is selected
+filtered_df = query.combine_stats(filtered_df, ['PlayerName', 'Country'], needs_agg)
 
 
 
@@ -267,43 +144,10 @@ top_n_option = st.sidebar.selectbox(
     index=2 #default
 )
 
-if top_n_option == 'All':
-    top_n = None  #do nothing if All is selected
-else: #otherwise
-    top_n = int(top_n_option.split()[1]) #take the selection as a string and turn into integer (10, 25, or 50)
+top_n = query.parse_top_n(top_n_option) #None when All is selected
 
 
-filtered_df = filtered_df.sort_values(by=y_col, ascending=False)
-if top_n is not None: #if other option selected
-    filtered_df = filtered_df.head(top_n)
-
-
-# ---- Apply Top N players to line chart ----
-# this chunk is possibly repetitive but it works so I'll leave it
-if top_n is not None and not filtered_df_line.empty: 
-    if y_col == 'Number': #if the stat is Aces
-        ranking = (
-            filtered_df_line.groupby('PlayerName', as_index=False)[y_col]
-            .sum() #groups by player, and aggregates by total aces
-            .sort_values(by=y_col, ascending=False)
-        )
-    else: #if any other stat
-        ranking = ( #similar weighted average logic as before
-            filtered_df_line
-            .assign(weighted_val=lambda d: d[y_col] * d['Matches']) #multiply percentage by total matches
-            .groupby('PlayerName', as_index=False)
-            .agg(weighted_val=('weighted_val', 'sum'), Matches=('Matches', 'sum')) #total up percentages and matches
-            .assign(**{y_col: lambda d: d['weighted_val'] / d['Matches']}) #divide total percent by matches to get weighted
-            .drop(columns='weighted_val') #drop temp column
-            .sort_values(by=y_col, ascending=False)
-        )
-
-    # Get top N player names
-    top_players = ranking.head(top_n)['PlayerName'].tolist()
-
-    # Keep only their full time-series data
-    filtered_df_line = filtered_df_line[filtered_df_line['PlayerName'].isin(top_players)]
-
+filtered_df = query.top_per_stat(filtered_df, top_n)
 
 
 
@@ -313,8 +157,18 @@ hover_cols = ['Matches'] #default. Always want matches to show
 if 'Country' in filtered_df.columns and selected_countries and 'all' not in selected_countries:
     hover_cols.append('Country') #add country to the tooltip if specific country selected
 
+#rank and percentile among everyone with the same stat, time, surface and country. Looked up from tables built once per data version
+bar_hover_cols = list(hover_cols)
+if not needs_agg and len(selected_surfaces) == 1 and not filtered_df.empty:
+    slice_ranks = ranks.individual_ranks(selected_stat, selected_time, selected_surfaces[0])
+    filtered_df = filtered_df.join(slice_ranks[['Rank', 'Percentile', 'Ranked']], on=['Country', 'PlayerName'])
+    bar_hover_cols += ['Rank', 'Percentile', 'Ranked']
 
 
+
+#plotly is only imported once there is a chart to draw, so the filters show up first
+import plotly.express as px
+
 #two tabs
 tab_1, tab_2 = st.tabs(["Individual Stats", "Individual Stats Over Time"])
 
@@ -333,10 +187,11 @@ with tab_1:
             filtered_df, 
             x='PlayerName',
             y=y_col, #dynamic axis for selected stat
-            hover_data= hover_cols,
+            hover_data= bar_hover_cols,
             title=f"{selected_stat} by Player",
             labels={'PlayerName': 'Player',
-                   'Number': 'Aces'}
+                   'Number': 'Aces',
+                   'Ranked': 'Players Ranked'}
         )
         fig.update_xaxes(categoryorder='array', categoryarray=order)
         st.plotly_chart(fig, use_container_width=True)
@@ -352,19 +207,38 @@ with tab_1:
 
 #second tab showing line chart
 with tab_2:
+    #yearly rows sorted by player and year, built once per data version, so career rows are already gone.
+    #the year range is a searchsorted slice per player
+    ind_series = series.individual_series()
+    first_year, last_year = ind_series.year_bounds()
+    year_range = (first_year, last_year)
+    if first_year is not None and first_year < last_year:  #no slider without at least two seasons to pick from
+        year_range = st.slider('Select Years', first_year, last_year, year_range)
+
+    filtered_df_line = query.filter_individual(ind_series.range(players_for_line, *year_range), stats=[selected_stat], surfaces=selected_surfaces)
+    filtered_df_line = query.combine_stats(filtered_df_line, ['PlayerName', 'year', 'Country'], needs_agg)
+
+    # ---- Apply Top N players to line chart ----
+    if top_n is not None and not filtered_df_line.empty:
+        # Keep only the top players' full time-series data
+        top_players = query.rank_line_players(filtered_df_line, y_col, top_n)
+        filtered_df_line = filtered_df_line[filtered_df_line['PlayerName'].isin(top_players)]
+
     if defaults_applied:
         st.caption("The Big Three are defaults. Select specific players or countries to view their stats.")
     if not filtered_df_line.empty:
         fig_2 = px.line(
-            filtered_df_line,
-            x='Time',
+            filtered_df_line.sort_values(['PlayerName', 'year']),
+            x='year',
             y=y_col,
             color='PlayerName',
             hover_data=hover_cols,
             title=f"{selected_stat} Over Time",
             labels={'PlayerName': 'Player',
-                   'Number': 'Aces'}
+                   'Number': 'Aces',
+                   'year': 'Year'}
         )
+        fig_2.update_xaxes(tickformat='d')  #numeric year axis, without the thousands separator
         st.plotly_chart(fig_2, use_container_width=True)
     else:
         st.write("No Data to Display")
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from atp import data, labels, query, warmup
 
 st.set_page_config(
     page_title="Win/Loss Index",
@@ -8,6 +8,9 @@ st.set_page_config(
     layout="wide"
 )
 
+#loads the other datasets and plotly in the background the first time any page runs
+warmup.start()
+
 #title
 st.title('Win/Loss Index Stats')
 st.caption('The Win/Loss Index shows the percentage of matches won by each player. Use the filters to view win percentages for different players, surfaces, tournaments, and more. ' \
@@ -16,14 +19,8 @@ st.caption('The Win/Loss Index shows the percentage of matches won by each playe
 #sidebar title
 st.sidebar.header('Filters')
 
-#cached data to speed up reloads
-@st.cache_data(ttl=3600) #refresh every hour
-def load_data_w_l():
-    return pd.read_csv('data_files/atp_win_loss_index.csv')
-
-w_l_df = load_data_w_l()
-w_l_df = w_l_df.dropna(subset=["Index"])
-w_l_df = w_l_df[w_l_df['Win'] + w_l_df['Loss'] > 1]
+#cached in atp.data until the csv changes. Drops rows without an index and players with one match or less
+w_l_df = query.clean_win_loss(data.read_win_loss())
 
 
 
@@ -36,25 +33,7 @@ w_l_df = w_l_df[w_l_df['Win'] + w_l_df['Loss'] > 1]
 players = sorted(w_l_df['PlayerName'].dropna().astype(str).unique())
 
 #changing category labels
-category_labels = {
-    'all' : 'All',
-    '1000': 'Masters 1000',
-    '5thset' : '5th Set',
-    'after1stsetwin' : 'After Winning 1st Set',
-    'carpet' : 'Carpet LOL',
-    'clay' : 'Clay',
-    'hard' : 'Hard',
-    'grass' : 'Grass',
-    'finals' : 'Finals',
-    'finalset' : 'Final Set',
-    'grandslam' : 'Grand Slams',
-    'indoor' : 'Indoors',
-    'outdoor' : 'Outdoors',
-    'tiebreak' : 'Tie Breaks',
-    'vslefthanders' : 'Vs Left Handers',
-    'vsrighthanders' : 'Vs Right Handers',
-    'vstop10' : 'Vs Top 10'
-}
+category_labels = labels.category_labels
 
 #Category options. 
 categories = [category_labels.get(cat, cat) for cat in sorted(w_l_df['Category'].unique())]
@@ -64,12 +43,7 @@ category_label_to_values = {v: k for k, v in category_labels.items()}
 
 
 #changing time period labels
-time_period_labels = {
-    'all' : 'All',
-    'career' : 'Career',
-    'roll' : '52 Week',
-    'ytd' : 'Year to Date'
-}
+time_period_labels = labels.time_period_labels
 
 # gets unique time periods for tp. Gets corresponding value in time_period_labels
 time_periods = [time_period_labels.get(tp, tp) for tp in sorted(w_l_df['TimePeriod'].unique())]
@@ -95,16 +69,7 @@ if 'selected_category_label' not in st.session_state:
     st.session_state['selected_category_label'] = ['All']
 
 def update_category(key):
-    sel = st.session_state[key] #grabs current list of selected fitlers
-    # If 'all' selected, there's more than one filter, and 'all' is most recent, overide to 'all'
-    if 'All' in sel and len(sel) > 1 and sel[-1] == 'All':
-        st.session_state[key] = ['All']
-    # If another option clicked while 'all' is present → remove 'all'
-    elif 'All' in sel and len(sel) > 1:
-        st.session_state[key] = [opt for opt in sel if opt != 'All'] # key = 
-    # If nothing selected → default to 'all'
-    elif not sel:
-        st.session_state[key] = ['All']
+    st.session_state[key] = query.resolve_selection(st.session_state[key], 'All')
 
 selected_category_label = st.sidebar.multiselect(
     'Select Categories', 
@@ -139,24 +104,13 @@ selected_countries = st.sidebar.multiselect(
 # APPLYING FILTER LOGIC
 #-------------
 
-#copying df
-filtered_df = w_l_df.copy()
-
-
-
-if selected_players:
-    filtered_df = filtered_df[filtered_df['PlayerName'].isin(selected_players)]
-
-if selected_category:
-    filtered_df = filtered_df[filtered_df['Category'].isin(selected_category)]
-
-if selected_time_period:
-    filtered_df = filtered_df[filtered_df['TimePeriod'] == selected_time_period]
-
-if selected_countries:
-    filtered_df = filtered_df[filtered_df['Country'].isin(
-        ['all' if c == 'All' else c for c in selected_countries]
-        )]
+filtered_df = query.filter_win_loss(
+    w_l_df,
+    players=selected_players,
+    categories=selected_category,
+    time_periods=[selected_time_period] if selected_time_period else None,
+    countries=['all' if c == 'All' else c for c in selected_countries]
+)
 
 
 
@@ -170,16 +124,8 @@ if selected_countries:
 
 
 if len(selected_category) > 1: #if more than one category selected
-    filtered_df = filtered_df.groupby('PlayerName').apply(
-        lambda g : pd.Series({  #apply temporary dataframe
-                                    'Win' : g['Win'].sum(), #total wins
-                                    'Loss' : g['Loss'].sum(), #total losses
-                                    'Titles' : g['Titles'].sum(), #total titles
-                                    #compute weighted index
-                                    'Index' : ((g['Index'] * (g['Win'] + g['Loss'])).sum() / (g['Win'] + g['Loss']).sum()).round(3)
-
-    })
-    ).reset_index()
+    #totals wins, losses and titles, with an index weighted by matches played
+    filtered_df = query.combine_categories(filtered_df)
 
 
 #initiating session state for min wins parameter
@@ -220,10 +166,7 @@ top_n_option = st.sidebar.selectbox(
     index=1 #default
 )
 
-if top_n_option == 'All':  
-    top_n = None  #do nothing if All is selected
-else:  #otherwise
-    top_n = int(top_n_option.split()[1])  #turn the option into an integer (10, 25, or 50)
+top_n = query.parse_top_n(top_n_option) #None when All is selected
 
 
 if top_n is not None: #if another option is selected
@@ -231,6 +174,9 @@ if top_n is not None: #if another option is selected
 
 #st.write(ranked_df[['PlayerName','Category']])
 
+#plotly is only imported once there is a chart to draw, so the filters show up first
+import plotly.express as px
+
 #---------------------
 # Plotting bar chart
 #---------------------